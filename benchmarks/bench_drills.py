@@ -0,0 +1,53 @@
+"""Time to make adaptive drills from a large dictionary.
+
+Reading the vocabulary happens once per dictionary; weighing runs
+before each drill with the latest statistics, and drawing is the
+part the alias table keeps constant per unit.
+
+Run from the repository root:
+
+    python benchmarks/bench_drills.py --entries 150000 --length 500
+
+"""
+
+import os
+import sys
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import write_dictionaries
+from timing import best_of
+from t_rex_typer.translation_dict import TranslationDict
+from t_rex_typer.drills import DrillGenerator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=150000, help="dictionary entries")
+    parser.add_argument("--practised", type=int, default=3000, help="units with statistics")
+    parser.add_argument("--length", type=int, default=500, help="units per drill")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per step; best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_dictionaries(directory, 1, args.entries)
+        dictionary = TranslationDict(paths, use_cache=False)
+
+    rng = random.Random(0)
+    seconds, generator = best_of(1, lambda: DrillGenerator(dictionary))
+    print(f"vocabulary of {len(generator.units):,} units read in {seconds*1000:.0f} ms")
+
+    performance = {unit: (rng.expovariate(2), rng.random() * 0.2, 10)
+                   for unit in rng.sample(generator.units, min(args.practised, len(generator.units)))}
+    seconds, _ = best_of(args.repeat, lambda: generator.weigh(performance))
+    print(f"weigh {len(performance):,} units: {seconds*1000:9.2f} ms ({len(generator.extra):,} raised)")
+
+    seconds, _ = best_of(args.repeat, lambda: generator.generate(args.length, rng))
+    print(f"draw {args.length} units:     {seconds*1000:9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
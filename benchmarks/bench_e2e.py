@@ -0,0 +1,208 @@
+"""End-to-end benchmark of the application under the offscreen Qt platform.
+
+Loads synthetic dictionaries into a MainWindow, practices a synthetic
+lesson by replaying key presses the way Plover types them (a space,
+then the word; misstrokes are typed and then taken back with
+backspaces) and reports:
+
+  - dictionary load time, without and with the cache
+  - translate throughput
+  - keystroke latency percentiles, to the end of the input handler
+    and to the repaint of the lesson viewer
+  - peak memory
+
+With --baseline, the results are compared to a stored run and the
+exit status is 1 when any got worse by more than --tolerance.
+
+Run from the repository root:
+
+    python benchmarks/bench_e2e.py --entries 150000 --units 2000 --save-baseline
+    python benchmarks/bench_e2e.py --entries 150000 --units 2000
+
+"""
+
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import tempfile
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings, the dictionary cache, session logs and practice
+# statistics go to a scratch home so that the user's are neither read
+# nor overwritten.  All are located when the application is imported.
+SCRATCH = tempfile.mkdtemp(prefix="t_rex_typer_bench_")
+os.environ['HOME'] = SCRATCH
+os.environ['XDG_CACHE_HOME'] = os.path.join(SCRATCH, "cache")
+os.environ['XDG_DATA_HOME'] = os.path.join(SCRATCH, "data")
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide2 import QtCore, QtWidgets
+from PySide2.QtTest import QTest
+
+from synthetic import WORDS, write_dictionaries, make_lesson
+from timing import best_of
+from t_rex_typer.latency import LatencyRecorder, percentile
+from t_rex_typer.translation_dict import TranslationDict
+from t_rex_typer.t_rex_typer import MainWindow
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "e2e_baseline.json")
+
+# whether a larger value of each metric is better
+HIGHER_IS_BETTER = {
+    'load_seconds': False,
+    'cached_load_seconds': False,
+    'translate_units_per_second': True,
+    'handler_p50_us': False,
+    'handler_p99_us': False,
+    'paint_p50_us': False,
+    'paint_p99_us': False,
+    'peak_rss_mib': False,
+}
+
+
+def plover_keys(lesson_units, miss_rate, seed=0):
+    """Key presses which practice the units, as Plover would type them.
+
+    Yields single characters and '\\b' for backspace.
+
+    """
+
+    rng = random.Random(seed)
+    for unit in lesson_units:
+        if rng.random() < miss_rate:
+            wrong = rng.choice([w for w in WORDS if w != unit])
+            yield from ' ' + wrong
+            yield from '\b' * (len(wrong) + 1)
+        yield from ' ' + unit
+
+
+def replay(app, main_window, keys):
+    line_edit = main_window.line_edit
+    for key in keys:
+        if key == '\b':
+            QTest.keyClick(line_edit, QtCore.Qt.Key_Backspace)
+        else:
+            QTest.keyClicks(line_edit, key)
+        # let the viewer repaint before the next key, as it would
+        # between strokes
+        app.processEvents()
+
+
+def run(args):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    results = {}
+
+    directory = os.path.join(SCRATCH, "dictionaries")
+    os.makedirs(directory)
+    paths = write_dictionaries(directory, args.files, args.entries)
+
+    results['load_seconds'], dictionary = best_of(1, lambda: TranslationDict(paths))
+    results['cached_load_seconds'], dictionary = best_of(1, lambda: TranslationDict(paths))
+
+    lesson = make_lesson(args.units)
+    seconds, _ = best_of(1, lambda: dictionary.translate(lesson))
+    results['translate_units_per_second'] = args.units / seconds
+
+    main_window = MainWindow()
+    main_window.show()
+    main_window._dictionary = dictionary
+
+    recorder = LatencyRecorder()
+    main_window.record_latency(recorder)
+
+    main_window.text_editor.setPlainText(lesson)
+    main_window.lesson_reset_timer.stop()
+    main_window._reset()
+    app.processEvents()
+
+    units = list(main_window.text_split)
+    replay(app, main_window, plover_keys(units, args.miss_rate))
+
+    for name in ('handler', 'paint'):
+        samples = sorted(recorder.samples.get(name, []))
+        for p in (50, 99):
+            value = percentile(samples, p)
+            results[f'{name}_p{p}_us'] = value / 1000 if value is not None else None
+
+    if resource:
+        # kilobytes on Linux
+        results['peak_rss_mib'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    main_window.close()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Names of the metrics which regressed beyond the tolerance."""
+    regressions = []
+    for name, value in results.items():
+        previous = baseline.get(name)
+        if value is None or previous is None:
+            continue
+        if HIGHER_IS_BETTER[name]:
+            worse = value < previous / (1 + tolerance)
+        else:
+            worse = value > previous * (1 + tolerance)
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=1, help="number of dictionaries")
+    parser.add_argument("--entries", type=int, default=150000, help="entries per dictionary")
+    parser.add_argument("--units", type=int, default=2000, help="units in the lesson")
+    parser.add_argument("--miss-rate", type=float, default=0.05, help="fraction of units misstroked first")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="stored results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative regression.  Default is 0.2, 20%%.")
+    args = parser.parse_args()
+
+    parameters = {'files': args.files, 'entries': args.entries,
+                  'units': args.units, 'miss_rate': args.miss_rate}
+
+    try:
+        results = run(args)
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+    for name, value in results.items():
+        print(f"{name:28} {value:12.3f}" if value is not None else f"{name:28} {'n/a':>12}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'parameters': parameters, 'results': results}, f, indent=2)
+        print(f"Saved baseline: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; store one with --save-baseline")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    if baseline['parameters'] != parameters:
+        print(f"Baseline was run with {baseline['parameters']}; not comparing")
+        return 0
+
+    regressions = compare(results, baseline['results'], args.tolerance)
+    for name in regressions:
+        print(f"REGRESSION {name}: {results[name]:.3f} vs baseline {baseline['results'][name]:.3f}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""Compare serial and parallel parsing of several Plover dictionaries.
+
+Run from the repository root:
+
+    python benchmarks/bench_load.py --files 8 --entries 150000
+
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import write_dictionaries
+from timing import best_of
+from t_rex_typer.translation_dict import TranslationDict
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=8, help="number of dictionaries")
+    parser.add_argument("--entries", type=int, default=150000, help="entries per dictionary")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="pool size")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_dictionaries(directory, args.files, args.entries)
+
+        serial, expected = best_of(args.repeat, lambda: TranslationDict.load(paths))
+        parallel, result = best_of(args.repeat, lambda: TranslationDict.load(paths, processes=args.processes))
+
+    assert list(result.items()) == list(expected.items()), "parallel load changed the merge"
+
+    print(f"{args.files} files x {args.entries} entries, {len(expected)} merged")
+    print(f"serial:               {serial:.3f}s")
+    print(f"parallel ({args.processes:>2} procs):  {parallel:.3f}s")
+    print(f"speedup:              {serial/parallel:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
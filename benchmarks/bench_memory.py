@@ -0,0 +1,62 @@
+"""Compare the memory held by dict-backed and compact dictionaries.
+
+Run from the repository root:
+
+    python benchmarks/bench_memory.py --entries 150000
+
+"""
+
+import os
+import sys
+import gc
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import write_dictionaries
+from t_rex_typer.translation_dict import TranslationDict
+
+
+def measure(func):
+    """Return (retained bytes, peak bytes, seconds, result) of func()."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained, peak, elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=1, help="number of dictionaries")
+    parser.add_argument("--entries", type=int, default=150000, help="entries per dictionary")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_dictionaries(directory, args.files, args.entries)
+
+        results = {
+            "dict":    measure(lambda: TranslationDict(paths, use_cache=False)),
+            "compact": measure(lambda: TranslationDict(paths, use_cache=False, compact=True)),
+        }
+
+    expected = results["dict"][3]
+    for units in (["the"], ["went"], [expected.get(next(iter(expected)))]):
+        assert results["compact"][3].translate_batch(units) == expected.translate_batch(units)
+
+    print(f"{args.files} files x {args.entries} entries, {len(expected)} merged")
+    for name, (retained, peak, elapsed, _) in results.items():
+        print(f"{name:8} retained {retained/2**20:7.1f} MiB  "
+              f"peak {peak/2**20:7.1f} MiB  load {elapsed:.2f}s")
+    print(f"reduction: {results['dict'][0]/results['compact'][0]:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Throughput of each dictionary format.
+
+Run from the repository root:
+
+    python benchmarks/bench_parsers.py --entries 150000
+
+"""
+
+import os
+import sys
+import bz2
+import gzip
+import lzma
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import write_dictionaries, make_dictionary
+from timing import best_of
+from t_rex_typer.translation_dict import read_dictionary
+
+
+def write_rtf(path, dictionary):
+    with open(path, 'w', encoding='cp1252', errors='replace') as f:
+        f.write('{\\rtf1\\ansi{\\*\\cxrev100}\\cxdict{\\*\\cxsystem synthetic}\n')
+        for stroke, translation in dictionary.items():
+            f.write(f'{{\\*\\cxs {stroke}}}{translation}\n')
+        f.write('}\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=150000, help="entries per dictionary")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per format; best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path, = write_dictionaries(directory, 1, args.entries)
+        with open(json_path, 'rb') as f:
+            contents = f.read()
+
+        paths = {'json': json_path}
+        for suffix, opener in (('gz', gzip.open), ('bz2', bz2.open), ('xz', lzma.open)):
+            paths[f'json.{suffix}'] = f"{json_path}.{suffix}"
+            with opener(paths[f'json.{suffix}'], 'wb') as f:
+                f.write(contents)
+        paths['rtf'] = os.path.join(directory, 'dictionary.rtf')
+        write_rtf(paths['rtf'], make_dictionary(args.entries))
+
+        print(f"{'format':10} {'file MiB':>9} {'seconds':>8} {'MiB/s':>8} {'entries/s':>11}")
+        for name, path in paths.items():
+            size = os.path.getsize(path) / 2**20
+            best, entries = best_of(args.repeat, lambda: len(read_dictionary(path)))
+            print(f"{name:10} {size:9.1f} {best:8.3f} {size/best:8.1f} {entries/best:11,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Query times of the practice statistics store at classroom scale.
+
+Run from the repository root:
+
+    python benchmarks/bench_statistics.py --sessions 5000 --units 200
+
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import WORDS
+from timing import best_of
+from t_rex_typer.practice_stats import StatisticsStore, connect
+
+
+def fill(path, sessions, units, seed=0):
+    rng = random.Random(seed)
+    vocabulary = WORDS + [f"{w}{i}" for i in range(20) for w in WORDS]
+    start = time.time() - 365 * 24 * 3600
+    connection = connect(path)
+    with connection:
+        for session_id in range(1, sessions + 1):
+            started = start + session_id * 365 * 24 * 3600 / sessions
+            connection.execute("INSERT INTO sessions (id, started, lesson) VALUES (?, ?, ?)",
+                               (session_id, started, None))
+            connection.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(session_id, i, rng.choice(vocabulary), rng.expovariate(2),
+                  int(rng.random() < 0.1), 1 + int(rng.random() < 0.05), started + i)
+                 for i in range(units)])
+        # StatisticsStore keeps these totals as it inserts
+        connection.execute(
+            "INSERT INTO unit_weeks SELECT unit, strftime('%Y-%W', finished, 'unixepoch'),"
+            " COUNT(*), SUM(missed), SUM(seconds) FROM results GROUP BY 1, 2")
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=5000, help="practice sessions")
+    parser.add_argument("--units", type=int, default=200, help="results per session")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query; best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "statistics.sqlite3")
+        seconds, _ = best_of(1, lambda: fill(path, args.sessions, args.units))
+        print(f"{args.sessions * args.units:,} results written in {seconds:.1f}s")
+
+        store = StatisticsStore(path)
+        queries = {
+            '50 slowest, last 1000 sessions': lambda: store.slowest_units(50, 1000),
+            'miss rate per week, one unit':   lambda: store.miss_rates_by_week(WORDS[0]),
+            'miss rate per unit per week':    lambda: store.miss_rates_by_week(),
+            'unit performance':               lambda: store.unit_performance(),
+        }
+        for name, query in queries.items():
+            seconds, rows = best_of(args.repeat, query)
+            print(f"{name:32} {seconds*1000:9.1f} ms {len(rows):8} rows")
+
+        # the writer's cost on the input path
+        store.begin_session()
+        start = time.perf_counter()
+        for i in range(10000):
+            store.add_result(i, WORDS[i % len(WORDS)], 0.5, False, 1)
+        print(f"add_result: {(time.perf_counter() - start) / 10000 * 1e6:.1f} us per call")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Speed of splitting text into strokable units.
+
+Compares the single pass tokenizer with the previous findall and
+apostrophe loop, on prose with punctuation and quotes.
+
+Run from the repository root:
+
+    python benchmarks/bench_tokenize.py --units 1000000
+
+"""
+
+import io
+import os
+import re
+import sys
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import WORDS
+from timing import best_of
+from t_rex_typer.translation_dict import TranslationDict
+
+
+# the tokenizer before the single pass pattern, kept for comparison
+PREVIOUS_UNIT_REGEX = r"[\w']+|[{}()\[\]~`!@#$%^&*-_+=|\/.,:;\"]"
+
+
+def previous_split(text):
+    text_split = []
+    for stroke_unit in re.findall(PREVIOUS_UNIT_REGEX, text):
+        if stroke_unit[0] == "\'" or stroke_unit[-1] == "\'":
+            for u in stroke_unit.split("\'"):
+                text_split.append(u if u else "'")
+        else:
+            text_split.append(stroke_unit)
+    return text_split
+
+
+def make_prose(units, seed=0):
+    rng = random.Random(seed)
+    words = WORDS + ["don't", "it's", "o'clock", "'tis", "dogs'"]
+    parts = []
+    for _ in range(units):
+        word = rng.choice(words)
+        r = rng.random()
+        if r < 0.1:
+            word += rng.choice(',.;:?!')
+        elif r < 0.12:
+            word = f'"{word}"'
+        elif r < 0.13:
+            word = f"({word})"
+        parts.append(word)
+    return ' '.join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--units", type=int, default=1000000, help="words in the corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per tokenizer; best is reported")
+    args = parser.parse_args()
+
+    text = make_prose(args.units)
+    print(f"corpus: {len(text)/2**20:.1f} MiB")
+
+    tokenizers = {
+        'previous':  lambda: previous_split(text),
+        'split':     lambda: TranslationDict.split_into_strokable_units(text),
+        'iter':      lambda: sum(1 for _ in TranslationDict.iter_strokable_units(text)),
+        'iter file': lambda: sum(1 for _ in TranslationDict.iter_strokable_units(io.StringIO(text))),
+    }
+
+    print(f"{'tokenizer':10} {'seconds':>8} {'units/s':>12}")
+    for name, tokenize in tokenizers.items():
+        seconds, result = best_of(args.repeat, tokenize)
+        count = result if isinstance(result, int) else len(result)
+        print(f"{name:10} {seconds:8.3f} {count/seconds:12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
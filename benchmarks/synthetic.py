@@ -0,0 +1,61 @@
+"""Synthetic Plover dictionaries and lessons for the benchmarks."""
+
+import os
+import json
+import random
+
+
+LEFT   = "STKPWHR"
+VOWELS = "AO*EU"
+RIGHT  = "FRPBLGTSDZ"
+
+WORDS = ("the of and to a in is you that it he was for on are as with his "
+         "they i at be this have from or one had by word but not what all "
+         "were we when your can said there use an each which she do how "
+         "their if will up other about out many then them these so some her "
+         "would make like him into time has look two more write go see number "
+         "no way could people my than first water been call who oil its now "
+         "find long down day did get come made may part went").split()
+
+
+def random_stroke(rng):
+    def keys(bank):
+        return ''.join(k for k in bank if rng.random() < 0.3)
+
+    left, vowels, right = keys(LEFT), keys(VOWELS), keys(RIGHT)
+    if not vowels:
+        return f"{left}-{right}" if right else left or "S"
+    return f"{left}{vowels}{right}"
+
+
+def random_translation(rng):
+    word = rng.choice(WORDS)
+    # make most translations distinct, like a real dictionary
+    return word if rng.random() < 0.05 else f"{word}{rng.randrange(1 << 20)}"
+
+
+def make_dictionary(entries, seed=0):
+    rng = random.Random(seed)
+    d = {}
+    while len(d) < entries:
+        strokes = '/'.join(random_stroke(rng) for _ in range(rng.choice((1, 1, 1, 2, 3))))
+        d[strokes] = random_translation(rng)
+    for i, word in enumerate(WORDS):
+        d[f"W{i}"] = word
+    return d
+
+
+def write_dictionaries(directory, files, entries, seed=0):
+    """Write Plover-formatted json dictionaries and return their paths."""
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f"dictionary_{i}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(make_dictionary(entries, seed + i), f, indent=0, ensure_ascii=False)
+        paths.append(path)
+    return paths
+
+
+def make_lesson(units, seed=0):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) for _ in range(units))
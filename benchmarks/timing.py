@@ -0,0 +1,21 @@
+"""Timing helper shared by the benchmarks."""
+
+import time
+
+
+def best_of(repeat, function):
+    """Call function repeat times.
+
+    Returns
+    -------
+
+    Tuple of the shortest time in seconds and the last result.
+
+    """
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
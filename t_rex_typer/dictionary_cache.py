@@ -0,0 +1,401 @@
+import os
+import mmap
+import zlib
+import struct
+import hashlib
+from array import array
+from itertools import accumulate, chain
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+
+import logging
+log = logging.getLogger(__name__)
+
+
+CACHE_DIRECTORY = os.path.join(
+    os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser("~"), ".cache"),
+    "t_rex_typer")
+
+# Layout of a cache file.  All integers are native uint32.
+#
+#   header               see HEADER
+#   stroke_offsets       n+1  offsets of each stroke in the stroke blob
+#   translation_offsets  m+1  offsets of each translation in the translation blob
+#   entry_translation    n    translation id of each entry
+#   stroke_order         n    entry ids sorted by stroke
+#   posting_offsets      m+1  start of each translation's entries in postings
+#   postings             n    entry ids grouped by translation, ranked
+#   stroke blob               utf-8 strokes, in dictionary order
+#   translation blob          utf-8 distinct translations, sorted
+#
+# Entries keep the dictionary (insertion) order.  Strokes and
+# translations are sorted by their utf-8 bytes so that lookups can
+# bisect.  The strokes of each translation are stored best first
+# according to the cost model the cache was written with, ties by
+# stroke.
+MAGIC   = b'TREXDICT'
+VERSION = 3
+HEADER  = struct.Struct('=8sI20sIIII')
+
+
+class CacheError(Exception):
+    """Cache file is missing, stale or corrupt."""
+
+
+def _signature(paths, ranking=''):
+    """Hash the paths, mtimes and sizes of the source dictionaries.
+
+    The ranking identifies the cost model used to order strokes.
+
+    """
+
+    h = hashlib.sha1(f"{ranking}\0".encode('utf-8'))
+    for path in paths:
+        st = os.stat(path)
+        h.update(f"{os.path.abspath(path)}\0{st.st_mtime_ns}\0{st.st_size}\0".encode('utf-8'))
+    return h.digest()
+
+
+def cache_path(paths, cache_directory=None):
+    """Path of the cache file for a list of dictionaries.
+
+    The name depends only on the source paths so that a stale cache
+    is overwritten rather than left behind.
+
+    """
+
+    h = hashlib.sha1('\0'.join(os.path.abspath(p) for p in paths).encode('utf-8'))
+    return os.path.join(cache_directory or CACHE_DIRECTORY, h.hexdigest() + '.cache')
+
+
+class _Strings:
+    """Sequence of utf-8 strings packed into one buffer."""
+
+    __slots__ = ('_offsets', '_blob')
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self._blob[self._offsets[i]:self._offsets[i+1]], 'utf-8')
+
+    def raw(self, i):
+        return bytes(self._blob[self._offsets[i]:self._offsets[i+1]])
+
+    def containing(self, sub):
+        """Indices of the strings containing sub, found by scanning the buffer."""
+        blob = bytes(self._blob)
+        sub = sub.encode('utf-8')
+        indices = []
+        pos = blob.find(sub)
+        while pos != -1:
+            i = bisect_right(self._offsets, pos) - 1
+            indices.append(i)
+            # continue from the next string
+            pos = blob.find(sub, self._offsets[i+1])
+        return indices
+
+
+class _Sorted:
+    """Sequence view of strings, as bytes, in a given order."""
+
+    __slots__ = ('_strings', '_order')
+
+    def __init__(self, strings, order=None):
+        self._strings = strings
+        self._order = order
+
+    def __len__(self):
+        return len(self._strings)
+
+    def __getitem__(self, i):
+        if self._order is not None:
+            i = self._order[i]
+        return self._strings.raw(i)
+
+
+class CompiledReverseIndex(Mapping):
+    """Read-only mapping of translation to strokes of a compiled dictionary."""
+
+    __slots__ = ('_compiled',)
+
+    def __init__(self, compiled):
+        self._compiled = compiled
+
+    def __getitem__(self, translation):
+        c = self._compiled
+        t = c._find_translation(translation)
+        if t is None:
+            raise KeyError(translation)
+        return [c._strokes[c._postings[i]]
+                for i in range(c._posting_offsets[t], c._posting_offsets[t+1])]
+
+    def __iter__(self):
+        return iter(self._compiled._translations[t]
+                    for t in range(len(self._compiled._translations)))
+
+    def __len__(self):
+        return len(self._compiled._translations)
+
+    def containing(self, sub):
+        """Translations containing sub, without decoding the others."""
+        translations = self._compiled._translations
+        return [translations[i] for i in translations.containing(sub)]
+
+
+class CompiledDictionary(Mapping):
+    """Read-only mapping of strokes to translations backed by a buffer.
+
+    Lookups are answered directly from the buffer (a memory-mapped
+    cache file or the output of compile_dictionary) by bisection.  No
+    Python dict is built.  Each entry costs a few dozen bytes rather
+    than the few hundred of a dict entry and its string objects.
+
+    Parameters
+    ----------
+
+    buffer : bytes-like
+
+      Contents of a cache file, as written by write_cache.
+
+    signature : bytes, optional
+
+      Expected signature of the source dictionaries.  When given, a
+      cache built from different sources raises CacheError.
+
+    """
+
+    __slots__ = ('_entry_translation', '_stroke_order', '_posting_offsets', '_postings',
+                 '_strokes', '_translations', '_sorted_strokes', '_sorted_translations',
+                 'reverse')
+
+    def __init__(self, buffer, signature=None):
+        view = memoryview(buffer)
+        try:
+            magic, version, cached_signature, crc, n, m, blob_size = HEADER.unpack_from(view)
+        except struct.error:
+            raise CacheError("Truncated header") from None
+
+        if magic != MAGIC or version != VERSION:
+            raise CacheError("Not a cache file or unsupported version")
+        if signature is not None and cached_signature != signature:
+            raise CacheError("Cache is stale")
+
+        table_size = 4 * (4*n + 2*m + 3)
+        if len(view) != HEADER.size + table_size + blob_size:
+            raise CacheError("Unexpected cache size")
+        if zlib.crc32(view[HEADER.size:]) != crc:
+            raise CacheError("Checksum mismatch")
+
+        tables = view[HEADER.size:HEADER.size + table_size].cast('I')
+        blobs  = view[HEADER.size + table_size:]
+
+        pos = 0
+        def take(count):
+            nonlocal pos
+            pos += count
+            return tables[pos - count:pos]
+
+        stroke_offsets        = take(n + 1)
+        translation_offsets   = take(m + 1)
+        self._entry_translation = take(n)
+        self._stroke_order      = take(n)
+        self._posting_offsets   = take(m + 1)
+        self._postings          = take(n)
+
+        stroke_blob_size = stroke_offsets[n]
+        self._strokes      = _Strings(stroke_offsets, blobs[:stroke_blob_size])
+        self._translations = _Strings(translation_offsets, blobs[stroke_blob_size:])
+
+        self._sorted_strokes      = _Sorted(self._strokes, self._stroke_order)
+        self._sorted_translations = _Sorted(self._translations)
+
+        self.reverse = CompiledReverseIndex(self)
+
+    def _find_entry(self, stroke):
+        raw = stroke.encode('utf-8')
+        i = bisect_left(self._sorted_strokes, raw)
+        if i < len(self._sorted_strokes) and self._sorted_strokes[i] == raw:
+            return self._stroke_order[i]
+        return None
+
+    def _find_translation(self, translation):
+        if not isinstance(translation, str):
+            return None
+        raw = translation.encode('utf-8')
+        i = bisect_left(self._sorted_translations, raw)
+        if i < len(self._sorted_translations) and self._sorted_translations[i] == raw:
+            return i
+        return None
+
+    def __getitem__(self, stroke):
+        i = self._find_entry(stroke) if isinstance(stroke, str) else None
+        if i is None:
+            raise KeyError(stroke)
+        return self._translations[self._entry_translation[i]]
+
+    def __iter__(self):
+        return iter(self._strokes[i] for i in range(len(self._strokes)))
+
+    def __len__(self):
+        return len(self._strokes)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} with {len(self)} entries>"
+
+    def values(self):
+        return (self._translations[t] for t in self._entry_translation)
+
+    def items(self):
+        return ((self._strokes[i], self._translations[t])
+                for i, t in enumerate(self._entry_translation))
+
+
+def open_cache(paths, ranking='', cache_directory=None):
+    """Memory-map the cache for a list of dictionaries.
+
+    The cache is only used if it was written with the same ranking.
+
+    Returns
+    -------
+
+    CompiledDictionary, or None when there is no usable cache.
+
+    """
+
+    try:
+        signature = _signature(paths, ranking)
+        with open(cache_path(paths, cache_directory), 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return CompiledDictionary(buffer, signature)
+    except (OSError, ValueError, CacheError) as err:
+        log.debug(f"Not using dictionary cache: {err}")
+        return None
+
+
+def compile_dictionary(data, reverse, signature=bytes(20)):
+    """Pack a merged dictionary and its reverse index into one buffer.
+
+    Parameters
+    ----------
+
+    data : dict
+
+      Merged dictionary mapping strokes to translations.
+
+    reverse : dict
+
+      Reverse index mapping each translation to its strokes, best
+      first.
+
+    signature : bytes, optional
+
+      20 byte signature of the sources, see _signature.
+
+    Returns
+    -------
+
+    bytes in the cache file layout, readable by CompiledDictionary.
+
+    Raises
+    ------
+
+    ValueError when an entry is not a string.
+
+    """
+
+    if not {str}.issuperset(map(type, chain(data, data.values()))):
+        raise ValueError("Dictionary has non-string entries")
+
+    # str order is code point order, which utf-8 byte order follows,
+    # so nothing needs encoding to be sorted
+    strokes = list(data)
+    translations = sorted(reverse)
+    translation_ids = {t: i for i, t in enumerate(translations)}
+
+    def pack(strings):
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = array('I', accumulate(map(len, encoded), initial=0))
+        return offsets, b''.join(encoded)
+
+    stroke_offsets, stroke_blob = pack(strokes)
+    translation_offsets, translation_blob = pack(translations)
+
+    entry_translation = array('I', map(translation_ids.__getitem__, data.values()))
+    stroke_order = array('I', sorted(range(len(strokes)), key=strokes.__getitem__))
+
+    entry_ids = {s: i for i, s in enumerate(strokes)}
+    ranked = [reverse[t] for t in translations]
+    posting_offsets = array('I', accumulate(map(len, ranked), initial=0))
+    postings = array('I', map(entry_ids.__getitem__, chain.from_iterable(ranked)))
+
+    payload = b''.join([
+        stroke_offsets.tobytes(),
+        translation_offsets.tobytes(),
+        entry_translation.tobytes(),
+        stroke_order.tobytes(),
+        posting_offsets.tobytes(),
+        postings.tobytes(),
+        stroke_blob,
+        translation_blob,
+    ])
+
+    header = HEADER.pack(MAGIC, VERSION, signature, zlib.crc32(payload),
+                         len(strokes), len(translations),
+                         len(stroke_blob) + len(translation_blob))
+
+    return header + payload
+
+
+def write_cache(paths, data, reverse, ranking='', cache_directory=None):
+    """Write the compiled form of a merged dictionary.
+
+    The file is written next to its destination and then moved into
+    place so that a reader never sees a partial cache.
+
+    Parameters
+    ----------
+
+    paths : list
+
+      Paths of the source dictionaries, in load order.
+
+    data : dict
+
+      Merged dictionary mapping strokes to translations.
+
+    reverse : dict
+
+      Reverse index mapping each translation to its strokes, best
+      first.
+
+    ranking : str, optional
+
+      Identifies the cost model used to rank the strokes.
+
+    Returns
+    -------
+
+    The compiled bytes, as from compile_dictionary, or None when the
+    dictionary can't be compiled.
+
+    """
+
+    try:
+        compiled = compile_dictionary(data, reverse, _signature(paths, ranking))
+    except ValueError as err:
+        log.debug(f"Not caching dictionary: {err}")
+        return None
+
+    path = cache_path(paths, cache_directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(compiled)
+    os.replace(temp_path, path)
+    log.debug(f"Wrote dictionary cache: {path}")
+    return compiled
@@ -0,0 +1,394 @@
+import io
+import re
+import os
+import bz2
+import gzip
+import json
+import lzma
+from json.decoder import scanstring
+
+
+# Dictionary parsers are generators which take a text file object and
+# yield dicts of consecutive entries (stroke -> translation) as they
+# are read.  Files are never read into memory all at once.  A parser
+# is chosen by file extension or, failing that, by sniffing the start
+# of the (decompressed) contents.  See register_format.
+
+# characters read from a dictionary file at a time
+CHUNK_SIZE = 1 << 20
+
+
+########
+# JSON #
+########
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*').match
+_DECODER    = json.JSONDecoder()
+
+
+def _scan_pair(s, pos):
+    """Scan one 'key: value' member of a json object.
+
+    Returns the key, the value, the position after the trailing ','
+    or '}' delimiter, and whether the delimiter closed the object.
+    Raises IndexError or ValueError when the member is incomplete or
+    malformed.
+
+    """
+
+    pos = _WHITESPACE(s, pos).end()
+    if s[pos] != '"':
+        raise json.JSONDecodeError("Expecting property name enclosed in double quotes", s, pos)
+    key, pos = scanstring(s, pos + 1)
+
+    pos = _WHITESPACE(s, pos).end()
+    if s[pos] != ':':
+        raise json.JSONDecodeError("Expecting ':' delimiter", s, pos)
+
+    # Plover values are strings; anything else goes the slow way
+    pos = _WHITESPACE(s, pos + 1).end()
+    if s[pos] == '"':
+        value, pos = scanstring(s, pos + 1)
+    else:
+        value, pos = _DECODER.raw_decode(s, pos)
+
+    pos = _WHITESPACE(s, pos).end()
+    delimiter = s[pos]
+    if delimiter not in ',}':
+        raise json.JSONDecodeError("Expecting ',' delimiter", s, pos)
+
+    return key, value, pos + 1, delimiter == '}'
+
+
+def iter_json_chunks(f, chunk_size=CHUNK_SIZE):
+    """Incrementally parse a flat json object from a file object.
+
+    The file is read roughly chunk_size characters at a time and the
+    members of the top level object found in each chunk are decoded
+    together.  The file contents are never held in memory all at
+    once.
+
+    Parameters
+    ----------
+
+    f : file object
+
+      Text file containing a json object, such as a Plover
+      dictionary.
+
+    chunk_size : int, optional
+
+      Number of characters to read at a time.  Default is CHUNK_SIZE.
+
+    Yields
+    ------
+
+    Dicts of consecutive members, in file order.
+
+    """
+
+    buf = ''
+    is_open = False
+
+    while True:
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf += chunk
+
+        if not is_open:
+            pos = _WHITESPACE(buf).end()
+            if pos == len(buf) and not eof:
+                continue
+            if buf[pos:pos + 1] != '{':
+                raise json.JSONDecodeError("Expecting '{'", buf, pos)
+            buf = buf[pos + 1:]
+            is_open = True
+
+        # json strings can't contain raw newlines, so the last ",\n"
+        # always falls between tokens (most likely between members).
+        # Minified files have none; there the last '",' most likely
+        # ends a member.  When it doesn't, the fast path fails and the
+        # slow one keeps what follows the last complete member, so
+        # the buffer stays about a chunk long either way.
+        if eof:
+            cut = len(buf)
+        else:
+            cut = buf.rfind(',\n') + 1
+            if not cut:
+                end = buf.rfind('",')
+                cut = end + 2 if end != -1 else len(buf)
+        piece, buf = buf[:cut], buf[cut:]
+
+        # fast path: complete members decoded by the json module
+        members = piece.rstrip()
+        is_closed = members.endswith('}')
+        if not members or members[-1] in ',}':
+            try:
+                members = json.loads('{' + members[:-1] + '}')
+            except ValueError:
+                members = None
+        else:
+            members = None
+
+        # slow path: members span lines or values are nested
+        if members is None:
+            members = {}
+            pos = 0
+            is_closed = False
+            try:
+                while not is_closed:
+                    key, value, pos, is_closed = _scan_pair(piece, pos)
+                    members[key] = value
+            except (IndexError, ValueError):
+                if eof:
+                    raise json.JSONDecodeError("Invalid or truncated dictionary", piece, pos) from None
+                buf = piece[pos:] + buf
+
+        yield members
+
+        if is_closed:
+            return
+        if eof:
+            raise json.JSONDecodeError("Unexpected end of file", piece, len(piece))
+
+
+#######
+# RTF #
+#######
+
+# Plover reads RTF/CRE dictionaries as exported by CAT software.  Each
+# entry starts with a {\*\cxs STROKE} group and the translation runs
+# until the next entry.
+RTF_ENTRY = re.compile(r'\{\\\*\\cxs ([^{}\\]*)\}')
+
+RTF_TOKEN = re.compile(
+    r"\\([a-zA-Z]+)(-?\d+)? ?"   # control word
+    r"|\\'([0-9a-fA-F]{2})"      # hex escaped character
+    r"|\\(.)"                    # control symbol
+    r"|([{}])"                   # group
+    r"|([^\\{}\r\n]+)"           # text
+    r"|[\r\n]+", re.DOTALL)
+
+# RTF control words with a Plover equivalent
+RTF_CONTROL_WORDS = {
+    'cxds': '{^}',   # delete space
+    'cxfc': '{-|}',  # capitalize next
+    'cxfl': '{>}',   # lowercase next
+    'par':  '\n',
+    'line': '\n',
+    'tab':  '\t',
+}
+
+RTF_CONTROL_SYMBOLS = {'\\': '\\', '{': '{', '}': '}', '~': ' ', '_': '-', '-': ''}
+
+
+def rtf_to_plover(rtf):
+    """Convert the RTF of one translation to Plover syntax.
+
+    Handles the common CAT control words (e.g. \\cxds, \\cxfc and
+    {\\cxp. } punctuation), escapes and unicode.  Ignorable groups
+    such as comments are dropped, as are unknown control words.
+
+    """
+
+    # most translations are plain text
+    if '\\' not in rtf and '{' not in rtf and '}' not in rtf:
+        return rtf.strip()
+
+    out = []
+    stack = []
+    skip = False    # inside an ignorable {\* } group
+    punct = None    # start in out of a {\cxp } group
+    fallback = 0    # characters to drop after a \u escape
+
+    for match in RTF_TOKEN.finditer(rtf):
+        word, arg, hex_code, symbol, brace, text = match.groups()
+
+        if brace == '{':
+            stack.append((skip, punct))
+            punct = None
+        elif brace == '}':
+            if punct is not None and not skip:
+                mark = ''.join(out[punct:]).strip()
+                del out[punct:]
+                if mark:
+                    out.append('{' + mark + '}')
+            if stack:
+                skip, punct = stack.pop()
+        elif skip:
+            continue
+        elif symbol == '*':
+            skip = True
+        elif word:
+            if word == 'cxp':
+                punct = len(out)
+            elif word == 'u' and arg:
+                out.append(chr(int(arg) % 0x10000))
+                fallback = 1
+            elif word in RTF_CONTROL_WORDS:
+                out.append(RTF_CONTROL_WORDS[word])
+        elif hex_code:
+            out.append(bytes([int(hex_code, 16)]).decode('cp1252', errors='replace'))
+        elif symbol:
+            out.append(RTF_CONTROL_SYMBOLS.get(symbol, ''))
+        elif text:
+            out.append(text[fallback:])
+            fallback = 0
+
+    return ''.join(out).strip()
+
+
+def iter_rtf_chunks(f, chunk_size=CHUNK_SIZE):
+    """Incrementally parse an RTF/CRE dictionary from a file object.
+
+    Yields
+    ------
+
+    Dicts of consecutive entries, in file order.
+
+    """
+
+    buf = ''
+    while True:
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf += chunk
+
+        matches = list(RTF_ENTRY.finditer(buf))
+
+        # the last entry may continue in the next chunk
+        complete = len(matches) if eof else len(matches) - 1
+        entries = {}
+        for i in range(max(complete, 0)):
+            end = matches[i+1].start() if i + 1 < len(matches) else len(buf)
+            entries[matches[i].group(1)] = rtf_to_plover(buf[matches[i].end():end])
+        yield entries
+
+        if eof:
+            return
+
+        # before the first entry, only keep enough to find a split marker
+        buf = buf[matches[-1].start():] if matches else buf[-256:]
+
+
+############
+# Registry #
+############
+
+FORMATS = {}     # name -> (parser, encoding)
+EXTENSIONS = {}  # extension -> name
+SNIFFERS = []    # (predicate of the first bytes, name)
+
+# compressed files are decompressed on the fly
+COMPRESSION = (
+    (b'\x1f\x8b', '.gz', gzip.open),
+    (b'BZh', '.bz2', bz2.open),
+    (b'\xfd7zXZ\x00', '.xz', lzma.open),
+)
+
+
+def register_format(name, parser, extensions=(), sniff=None, encoding='utf-8'):
+    """Add a dictionary format.
+
+    Parameters
+    ----------
+
+    name : str
+
+      Name of the format, e.g. 'json'.
+
+    parser : callable
+
+      Generator called as parser(f, chunk_size), with a text file
+      object and the number of characters to read at a time, and
+      yielding dicts of entries.
+
+    extensions : iterable, optional
+
+      File extensions, with the dot, which select this format.
+
+    sniff : callable, optional
+
+      Predicate taking the first bytes of the contents, used when the
+      extension is unknown.
+
+    encoding : str, optional
+
+      Text encoding of the format.  Default is 'utf-8'.
+
+    """
+
+    FORMATS[name] = (parser, encoding)
+    for extension in extensions:
+        EXTENSIONS[extension.lower()] = name
+    if sniff:
+        SNIFFERS.append((sniff, name))
+
+
+register_format('rtf', iter_rtf_chunks, ('.rtf',),
+                sniff=lambda head: head.startswith(b'{\\rtf'),
+                encoding='cp1252')
+register_format('json', iter_json_chunks, ('.json',),
+                sniff=lambda head: head.startswith(b'{'),
+                encoding='utf-8-sig')
+
+
+def open_dictionary(path):
+    """Open a dictionary file as text, decompressing if needed.
+
+    Returns
+    -------
+
+    Tuple of the text file object and the name of its format.
+
+    Raises
+    ------
+
+    ValueError when the format can't be determined.
+
+    """
+
+    with open(path, 'rb') as f:
+        magic = f.read(6)
+
+    name, extension = os.path.splitext(path)
+    binary = None
+    for signature, suffix, opener in COMPRESSION:
+        if magic.startswith(signature):
+            binary = opener(path, 'rb')
+            if extension.lower() == suffix:
+                name, extension = os.path.splitext(name)
+            break
+    if binary is None:
+        binary = open(path, 'rb')
+    binary = io.BufferedReader(binary) if not hasattr(binary, 'peek') else binary
+
+    format_name = EXTENSIONS.get(extension.lower())
+    if format_name is None:
+        head = binary.peek(64)[:64].lstrip(b'\xef\xbb\xbf \t\r\n')
+        for sniff, candidate in SNIFFERS:
+            if sniff(head):
+                format_name = candidate
+                break
+        else:
+            binary.close()
+            raise ValueError(f"Unknown dictionary format: {path}")
+
+    parser, encoding = FORMATS[format_name]
+    return io.TextIOWrapper(binary, encoding=encoding, errors='replace'), format_name
+
+
+def iter_dictionary(path, chunk_size=CHUNK_SIZE):
+    """Parse a dictionary of any registered format.
+
+    Yields
+    ------
+
+    Dicts of consecutive entries, in file order.
+
+    """
+
+    f, format_name = open_dictionary(path)
+    parser, _ = FORMATS[format_name]
+    with f:
+        yield from parser(f, chunk_size)
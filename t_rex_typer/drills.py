@@ -0,0 +1,187 @@
+import random
+from array import array
+
+import logging
+log = logging.getLogger(__name__)
+
+from . import stroke_codec
+from .translation_dict import UNIT_PATTERN
+
+
+# units in a generated drill
+DRILL_LENGTH = 500
+
+# How much past performance raises a unit's weight.  A unit which
+# takes twice the typical time gains SLOW_WEIGHT; one always missed
+# gains MISS_WEIGHT.
+SLOW_WEIGHT = 4.0
+MISS_WEIGHT = 8.0
+
+# weight added to units one key away from a troublesome unit
+SIMILAR_WEIGHT = 2.0
+
+# how many of the heaviest units have their neighbours raised
+TROUBLE_COUNT = 200
+
+
+class AliasTable:
+    """Sample indices in proportion to weights in constant time.
+
+    Vose's alias method.  Building the table takes time linear in
+    the number of weights; each sample is then one random number, a
+    lookup and a comparison.
+
+    Parameters
+    ----------
+
+    weights : sequence of float
+
+      Non-negative weights, not all zero.
+
+    """
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = sum(weights)
+        if n == 0 or total <= 0:
+            raise ValueError("Weights must include a positive value")
+
+        scaled = [w * n / total for w in weights]
+        self._probability = array('d', [1.0]) * n
+        self._alias = array('I', range(n))
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._probability[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # what remains is 1 up to rounding
+
+    def __len__(self):
+        return len(self._probability)
+
+    def sample(self, rng=random):
+        u = rng.random() * len(self._probability)
+        i = int(u)
+        return i if u - i < self._probability[i] else self._alias[i]
+
+
+class DrillGenerator:
+    """Make drills from a dictionary, weighted by past performance.
+
+    The vocabulary is every translation of the dictionary which is a
+    single strokable unit.  Units which were slow or missed are
+    drawn more often, as are units whose stroke differs by one key
+    from the most troublesome ones.  The vocabulary is read once and
+    the weights are kept in an alias table, so drawing a drill only
+    samples.
+
+    Parameters
+    ----------
+
+    dictionary : TranslationDict
+
+      Dictionary to draw the units from.
+
+    performance : dict, optional
+
+      Mapping of unit to (mean seconds, miss rate, count), as from
+      StatisticsStore.unit_performance.
+
+    """
+
+    def __init__(self, dictionary, performance=None):
+        self.dictionary = dictionary
+        self.units = sorted({t for t in dictionary.values()
+                             if isinstance(t, str) and UNIT_PATTERN.fullmatch(t) and t[0].isalnum()})
+        if not self.units:
+            raise ValueError("Dictionary has no words to drill")
+        self._position = {unit: i for i, unit in enumerate(self.units)}
+        log.debug(f"Drill vocabulary of {len(self.units)} units")
+
+        self.weigh(performance)
+
+    def weigh(self, performance=None):
+        """Set the weights of the units from past performance.
+
+        Every unit weighs 1 plus what its performance adds.  Only the
+        added weights are kept in the alias table; a draw first picks
+        between the even share and the added one.  New statistics are
+        so taken up in time proportional to the statistics, not the
+        vocabulary.
+
+        Parameters
+        ----------
+
+        performance : dict, optional
+
+          Mapping of unit to (mean seconds, miss rate, count).
+
+        """
+
+        extra = {}
+        if performance:
+            times = sorted(seconds for seconds, _, _ in performance.values())
+            typical = times[len(times) // 2] or 1.0
+            for unit, (seconds, miss_rate, _) in performance.items():
+                i = self._position.get(unit, self._position.get(unit.lower()))
+                weight = SLOW_WEIGHT * max(0.0, seconds / typical - 1) + MISS_WEIGHT * miss_rate
+                if i is not None and weight > 0:
+                    extra[i] = extra.get(i, 0.0) + weight
+
+            self._raise_similar(extra)
+
+        self.extra = extra
+        self._boosted = list(extra)
+        self._table = AliasTable(list(extra.values())) if extra else None
+        self._even_share = len(self.units) / (len(self.units) + sum(extra.values()))
+
+    def _raise_similar(self, extra):
+        # The neighbours of a stroke are the strokes at distance 1:
+        # one key added or removed.  Looking them up directly keeps
+        # this proportional to the troublesome units, not the
+        # vocabulary.
+        dictionary = self.dictionary
+        trouble = sorted(extra, key=extra.__getitem__, reverse=True)[:TROUBLE_COUNT]
+        for i in trouble:
+            for outline in dictionary.get_strokes(self.units[i]):
+                if '/' in outline:
+                    continue
+                try:
+                    mask = stroke_codec.encode_stroke(outline)
+                except ValueError:
+                    continue
+                for bit in range(len(stroke_codec.KEYS)):
+                    j = self._position.get(dictionary.get(stroke_codec.decode_stroke(mask ^ (1 << bit))))
+                    if j is not None and j != i:
+                        extra[j] = extra.get(j, 0.0) + SIMILAR_WEIGHT
+
+    def sample(self, rng=random):
+        """Draw one unit."""
+        if self._table is None or rng.random() < self._even_share:
+            return self.units[int(rng.random() * len(self.units))]
+        return self.units[self._boosted[self._table.sample(rng)]]
+
+    def generate(self, length=DRILL_LENGTH, rng=random):
+        """Draw a drill.
+
+        The same unit is not drawn twice in a row when there is a
+        choice.
+
+        Returns
+        -------
+
+        List of units.
+
+        """
+
+        drill = []
+        for _ in range(length):
+            unit = self.sample(rng)
+            if drill and unit == drill[-1] and len(self.units) > 1:
+                unit = self.sample(rng)
+            drill.append(unit)
+        return drill
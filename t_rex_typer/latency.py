@@ -0,0 +1,86 @@
+import time
+from bisect import bisect_left
+
+import logging
+log = logging.getLogger(__name__)
+
+
+# upper bounds of the histogram buckets, in microseconds
+BUCKETS = (100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of sorted samples."""
+    if not samples:
+        return None
+    rank = max(1, -(-len(samples) * p // 100))
+    return samples[int(rank) - 1]
+
+
+def histogram(samples):
+    """Count samples, in nanoseconds, in each of the BUCKETS.
+
+    Returns
+    -------
+
+    List of counts, one per bucket plus one for larger samples.
+
+    """
+
+    counts = [0] * (len(BUCKETS) + 1)
+    for ns in samples:
+        counts[bisect_left(BUCKETS, ns / 1000)] += 1
+    return counts
+
+
+class LatencyRecorder:
+    """Time spans from a start mark to later events.
+
+    Times are taken with time.perf_counter_ns.  A span is started
+    with start and measured with lap, which keeps it running, or
+    stop, which ends it.  Starting while a span runs keeps the
+    earlier start: the event which ends a span covers every start
+    since the last one.
+
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self._started = None
+
+    def start(self):
+        if self._started is None:
+            self._started = time.perf_counter_ns()
+
+    def lap(self, name):
+        if self._started is not None:
+            self.samples.setdefault(name, []).append(time.perf_counter_ns() - self._started)
+
+    def stop(self, name):
+        self.lap(name)
+        self._started = None
+
+    def report(self):
+        """Percentiles and histogram of each kind of span, as text."""
+        lines = []
+        for name, samples in self.samples.items():
+            samples = sorted(samples)
+            lines.append(f"{name}: {len(samples)} samples, microseconds")
+            for p in PERCENTILES:
+                lines.append(f"  p{p:<5} {percentile(samples, p) / 1000:10.1f}")
+            lines.append(f"  max    {samples[-1] / 1000:10.1f}")
+            lines.append(f"  histogram")
+            lower = 0
+            for upper, count in zip(BUCKETS + (None,), histogram(samples)):
+                label = f"{lower}-{upper}" if upper else f">{lower}"
+                lines.append(f"    {label:>13} {count:8}")
+                lower = upper
+            lines.append('')
+        return '\n'.join(lines)
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(self.report())
+        log.info(f"Wrote latency report: {path}")
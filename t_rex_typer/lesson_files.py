@@ -0,0 +1,126 @@
+import re
+import mmap
+import codecs
+
+import logging
+log = logging.getLogger(__name__)
+
+
+# size of the pieces a lesson file is decoded in
+LESSON_CHUNK_SIZE = 1 << 18
+
+# utf-32 first; its little-endian mark begins with utf-16's
+BOMS = ((codecs.BOM_UTF32_LE, 'utf-32'),
+        (codecs.BOM_UTF32_BE, 'utf-32'),
+        (codecs.BOM_UTF8,     'utf-8-sig'),
+        (codecs.BOM_UTF16_LE, 'utf-16'),
+        (codecs.BOM_UTF16_BE, 'utf-16'))
+
+# for files which aren't unicode
+FALLBACK_ENCODING = 'cp1252'
+
+NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+
+def detect_encoding(buffer, sample_size=1 << 16):
+    """Guess the encoding of a lesson file.
+
+    A byte order mark decides.  Otherwise the file is utf-8 unless a
+    sample from its first non-ASCII byte isn't valid utf-8.  Only the
+    sample is decoded; finding it is a byte search.
+
+    Parameters
+    ----------
+
+    buffer : bytes-like
+
+      Contents of the file, such as a memory map.
+
+    Returns
+    -------
+
+    Name of the encoding.
+
+    """
+
+    for bom, encoding in BOMS:
+        if buffer[:len(bom)] == bom:
+            return encoding
+
+    match = NON_ASCII.search(buffer)
+    if match is None:
+        return 'utf-8'
+
+    # backed up a little so as not to start inside a character
+    start = max(0, match.start() - 3)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        # not final: a character cut at the end of the sample is fine
+        decoder.decode(buffer[start:start + sample_size])
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+    return 'utf-8'
+
+
+def read_lesson_chunks(path, chunk_size=LESSON_CHUNK_SIZE):
+    """Open a lesson file to be read in pieces.
+
+    The file is memory-mapped and decoded once, a piece at a time.
+    Pieces end at whitespace so that no word is split between two
+    of them, and line endings are normalized to '\\n'.
+
+    Parameters
+    ----------
+
+    path : str
+
+      Path of a plain text lesson.
+
+    chunk_size : int, optional
+
+      Number of bytes decoded at a time.
+
+    Returns
+    -------
+
+    Iterator of str.
+
+    Raises
+    ------
+
+    OSError when the file can't be opened.
+
+    """
+
+    with open(path, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty files can't be mapped
+            buffer = b''
+
+    encoding = detect_encoding(buffer)
+    log.debug(f"Reading {path} as {encoding}")
+    return _iter_chunks(buffer, encoding, chunk_size)
+
+
+def _iter_chunks(buffer, encoding, chunk_size):
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    rest = ''
+    try:
+        for start in range(0, len(buffer), chunk_size):
+            text = rest + decoder.decode(buffer[start:start + chunk_size])
+            cut = max(text.rfind(' '), text.rfind('\n'), text.rfind('\t')) + 1
+            if cut:
+                yield _normalize_newlines(text[:cut])
+            rest = text[cut:]
+
+        rest += decoder.decode(b'', final=True)
+        if rest:
+            yield _normalize_newlines(rest)
+    finally:
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+
+
+def _normalize_newlines(text):
+    return text.replace('\r\n', '\n').replace('\r', '\n')
@@ -0,0 +1,195 @@
+import os
+import json
+import hashlib
+
+import logging
+log = logging.getLogger(__name__)
+
+from . import lesson_files
+from . import dictionary_cache
+from .translation_dict import TranslationDict
+
+
+# file names of lessons
+LESSON_EXTENSIONS = ('.txt',)
+
+INDEX_VERSION = 1
+
+
+def index_path(directory, cache_directory=None):
+    """Path of the persistent index of a lesson directory."""
+    h = hashlib.sha1(os.path.abspath(directory).encode('utf-8'))
+    return os.path.join(cache_directory or dictionary_cache.CACHE_DIRECTORY,
+                        f"lessons-{h.hexdigest()}.json")
+
+
+def dictionary_id(dictionary):
+    """Identify a dictionary's sources and their versions."""
+    if dictionary is None or not dictionary.sources:
+        return None
+    try:
+        return dictionary_cache._signature(dictionary.sources).hex()
+    except OSError:
+        return None
+
+
+def describe_lesson(path, dictionary=None):
+    """Count the units of a lesson file.
+
+    Parameters
+    ----------
+
+    path : str
+
+      Path of a plain text lesson.
+
+    dictionary : TranslationDict, optional
+
+      Dictionary to measure the coverage of the lesson with.
+
+    Returns
+    -------
+
+    dict with the number of words, units and distinct units, and the
+    coverage: the fraction of units the dictionary has strokes for,
+    or None without a dictionary.
+
+    """
+
+    counts = {}
+    words = 0
+    for unit in TranslationDict.iter_strokable_units(lesson_files.read_lesson_chunks(path)):
+        counts[unit] = counts.get(unit, 0) + 1
+        if unit[0].isalnum():
+            words += 1
+
+    units = sum(counts.values())
+    coverage = None
+    if dictionary and units:
+        covered = sum(n for unit, n in counts.items() if dictionary.get_strokes(unit))
+        coverage = covered / units
+
+    return {'words': words, 'units': units, 'distinct_units': len(counts), 'coverage': coverage}
+
+
+class LessonLibrary:
+    """Index of the lessons in a directory, kept between sessions.
+
+    Each lesson is described once (see describe_lesson) and the
+    description is stored with the file's modification time and size.
+    A refresh only reads lessons which are new or changed, or whose
+    coverage was measured with a different dictionary.
+
+    Parameters
+    ----------
+
+    directory : str
+
+      Directory of lesson files.  Subdirectories are included.
+
+    cache_directory : str, optional
+
+      Where the index is stored.  Default is the dictionary cache
+      directory.
+
+    """
+
+    def __init__(self, directory, cache_directory=None):
+        self.directory = directory
+        self.path = index_path(directory, cache_directory)
+
+        # lesson path -> description and stat
+        self.lessons = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError) as err:
+            log.debug(f"No lesson index: {err}")
+            return
+
+        if index.get('version') == INDEX_VERSION:
+            self.lessons = index['lessons']
+
+    def save(self):
+        """Write the index, replacing the old one in one step."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'lessons': self.lessons}, f)
+        os.replace(temp_path, self.path)
+
+    def _scan(self):
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.lower().endswith(LESSON_EXTENSIONS):
+                    yield os.path.join(root, filename)
+
+    def refresh(self, dictionary=None, progress=None):
+        """Bring the index up to date with the directory.
+
+        Parameters
+        ----------
+
+        dictionary : TranslationDict, optional
+
+          Dictionary to measure coverage with.
+
+        progress : callable, optional
+
+          Called as progress(done, total) after each lesson which had
+          to be read.  An exception raised by it stops the refresh;
+          lessons read so far are kept.
+
+        Returns
+        -------
+
+        Number of lessons read.
+
+        """
+
+        dictionary_key = dictionary_id(dictionary)
+
+        stale = []
+        found = set()
+        for path in self._scan():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.add(path)
+            entry = self.lessons.get(path)
+            if (entry is None
+                or entry['mtime_ns'] != st.st_mtime_ns
+                or entry['size'] != st.st_size
+                or entry['dictionary'] != dictionary_key):
+                stale.append((path, st))
+
+        # forget removed lessons
+        removed = len(self.lessons)
+        self.lessons = {path: entry for path, entry in self.lessons.items() if path in found}
+        removed -= len(self.lessons)
+
+        try:
+            for i, (path, st) in enumerate(stale):
+                try:
+                    entry = describe_lesson(path, dictionary)
+                except OSError as err:
+                    log.warning(f"Could not read lesson {path}: {err}")
+                    self.lessons.pop(path, None)
+                    continue
+                entry.update(mtime_ns=st.st_mtime_ns, size=st.st_size, dictionary=dictionary_key)
+                self.lessons[path] = entry
+                if progress:
+                    progress(i + 1, len(stale))
+        finally:
+            if stale or removed:
+                try:
+                    self.save()
+                except OSError as err:
+                    log.warning(f"Could not write lesson index: {err}")
+
+        log.debug(f"Lesson library {self.directory}: {len(self.lessons)} lessons, {len(stale)} read")
+        return len(stale)
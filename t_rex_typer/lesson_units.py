@@ -0,0 +1,135 @@
+from array import array
+from collections.abc import Sequence
+
+from .translation_dict import UNIT_PATTERN
+
+
+def utf16_length(text):
+    """Length of text in UTF-16 code units, as Qt counts positions."""
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-16-le')) // 2
+
+
+class LessonUnits(Sequence):
+    """Strokable units of a lesson, kept current as the text is edited.
+
+    Behaves as a read-only sequence of units.  The position of each
+    unit in the text is kept so that an edit only re-splits the text
+    around it (see replace).  Positions are in UTF-16 code units, as
+    QTextDocument reports them; they differ from str indices after
+    characters outside the Basic Multilingual Plane.
+
+    Parameters
+    ----------
+    text : str, optional
+
+      Initial lesson text.
+
+    """
+
+    # Positions after an edit move by the size of the edit.  Rather
+    # than move them all, the move is recorded as pending for every
+    # unit from _shift_index on and is only applied to the units
+    # between one edit and the next, or moved back to the edit when
+    # it comes first.  Edits close together stay cheap however long
+    # the lesson is.
+
+    def __init__(self, text=''):
+        self._units = []
+        self._starts = array('q')
+
+        self._shift_index = 0
+        self._shift = 0
+
+        if text:
+            self.replace(0, 0, text)
+
+    def __getitem__(self, i):
+        return self._units[i]
+
+    def __len__(self):
+        return len(self._units)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} with {len(self)} units>"
+
+    def start(self, i):
+        """Position in the text of the unit at index i."""
+        if i >= self._shift_index:
+            return self._starts[i] + self._shift
+        return self._starts[i]
+
+    def _index(self, position):
+        # index of the first unit starting at or after position
+        lo, hi = 0, len(self._units)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.start(mid) < position:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def replace(self, start, end, text):
+        """Update the units after part of the text was replaced.
+
+        The replaced part must begin and end at whitespace (or the
+        ends of the text) so that no unit is cut; units never contain
+        whitespace.
+
+        Parameters
+        ----------
+        start : int
+
+          Position of the replaced part.
+
+        end : int
+
+          End of the replaced part, before the edit.
+
+        text : str
+
+          Text which replaced it.
+
+        """
+
+        i = self._index(start)
+        j = self._index(end)
+
+        units = []
+        starts = array('q')
+        if text.isascii():
+            for match in UNIT_PATTERN.finditer(text):
+                units.append(match.group())
+                starts.append(start + match.start())
+            length = len(text)
+        else:
+            # count UTF-16 code units from one unit to the next
+            position, previous = start, 0
+            for match in UNIT_PATTERN.finditer(text):
+                position += utf16_length(text[previous:match.start()])
+                previous = match.start()
+                units.append(match.group())
+                starts.append(position)
+            length = utf16_length(text)
+
+        shift = length - (end - start)
+        grown = len(units) - (j - i)
+
+        # Move the pending shift to just after this edit, then let one
+        # shift cover everything after it.  Units between the old
+        # pending index and the edit are exact: forward, the shift is
+        # applied to them; backward, it is taken off so that adding
+        # it back leaves them where they are.
+        if self._shift_index <= i:
+            for k in range(self._shift_index, i):
+                self._starts[k] += self._shift
+        else:
+            for k in range(j, self._shift_index):
+                self._starts[k] -= self._shift
+        self._shift_index = j + grown
+        self._shift += shift
+
+        self._units[i:j] = units
+        self._starts[i:j] = starts
@@ -0,0 +1,260 @@
+import os
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import logging
+log = logging.getLogger(__name__)
+
+from .session_log import SESSION_DIRECTORY
+
+
+STATISTICS_PATH = os.path.join(os.path.dirname(SESSION_DIRECTORY), "statistics.sqlite3")
+
+# results are written this many at a time
+BATCH_SIZE = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id       INTEGER PRIMARY KEY,
+    started  REAL NOT NULL,
+    lesson   TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    session_id  INTEGER NOT NULL REFERENCES sessions (id),
+    unit_index  INTEGER NOT NULL,
+    unit        TEXT NOT NULL,
+    seconds     REAL NOT NULL,
+    missed      INTEGER NOT NULL,
+    attempts    INTEGER NOT NULL,
+    finished    REAL NOT NULL
+);
+-- covers the per-unit aggregates over recent sessions
+CREATE INDEX IF NOT EXISTS results_unit ON results (unit, session_id, seconds, missed);
+CREATE INDEX IF NOT EXISTS results_session ON results (session_id);
+
+-- running totals per unit and week, kept by StatisticsStore so that
+-- weekly rates don't scan the results
+CREATE TABLE IF NOT EXISTS unit_weeks (
+    unit     TEXT NOT NULL,
+    week     TEXT NOT NULL,
+    results  INTEGER NOT NULL,
+    missed   INTEGER NOT NULL,
+    seconds  REAL NOT NULL,
+    PRIMARY KEY (unit, week)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS unit_weeks_week ON unit_weeks (week);
+"""
+
+
+def connect(path):
+    """Open the statistics database, creating it if needed."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = sqlite3.connect(path)
+    # readers don't block the writer and vice versa
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class StatisticsStore:
+    """Per-unit practice results in an SQLite database.
+
+    Results are collected in memory and inserted in batches by a
+    single worker thread, which owns the writing connection.  Queries
+    use a separate connection on the calling thread.
+
+    Parameters
+    ----------
+
+    path : str, optional
+
+      Database file.  Default is STATISTICS_PATH.
+
+    """
+
+    def __init__(self, path=STATISTICS_PATH):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._writer = None
+        self._reader = None
+        self._reader_thread = None
+        self._session_id = None
+        self._results = []
+
+    ##########
+    # Writes #
+    ##########
+
+    def _submit(self, function, *args):
+        future = self._executor.submit(function, *args)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception():
+            log.warning(f"Could not write practice statistics: {future.exception()}")
+
+    def _connection(self):
+        # runs on the worker thread
+        if self._writer is None:
+            self._writer = connect(self.path)
+        return self._writer
+
+    def begin_session(self, lesson=None):
+        """Start a practice run; following results belong to it."""
+        self.flush()
+        self._submit(self._begin_session, time.time(), lesson)
+
+    def _begin_session(self, started, lesson):
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute("INSERT INTO sessions (started, lesson) VALUES (?, ?)",
+                                        (started, lesson))
+        self._session_id = cursor.lastrowid
+
+    def add_result(self, unit_index, unit, seconds, missed, attempts):
+        """Record the result of one unit.
+
+        Parameters
+        ----------
+
+        unit_index : int
+
+          Position of the unit in the lesson.
+
+        unit : str
+
+          The unit.
+
+        seconds : float
+
+          Time taken to complete the unit.
+
+        missed : bool
+
+          Whether the unit counted as a miss.
+
+        attempts : int
+
+          Number of times the unit was started.
+
+        """
+
+        self._results.append((unit_index, unit, seconds, int(missed), attempts, time.time()))
+        if len(self._results) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Hand the collected results to the worker."""
+        if self._results:
+            self._submit(self._insert, self._results)
+            self._results = []
+
+    def _insert(self, results):
+        if self._session_id is None:
+            self._begin_session(time.time(), None)
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT INTO results (session_id, unit_index, unit, seconds, missed, attempts, finished)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self._session_id,) + r for r in results])
+            connection.executemany(
+                "INSERT INTO unit_weeks (unit, week, results, missed, seconds)"
+                " VALUES (?, strftime('%Y-%W', ?, 'unixepoch'), 1, ?, ?)"
+                " ON CONFLICT (unit, week) DO UPDATE SET"
+                " results = results + 1,"
+                " missed = missed + excluded.missed,"
+                " seconds = seconds + excluded.seconds",
+                [(unit, finished, missed, seconds)
+                 for _, unit, seconds, missed, _, finished in results])
+
+    def close(self, wait=True):
+        """Write the remaining results and close the database."""
+        self.flush()
+        self._submit(self._close_writer)
+        self._executor.shutdown(wait=wait)
+        if self._reader is not None and self._reader_thread == threading.get_ident():
+            self._reader.close()
+            self._reader = None
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    ###########
+    # Queries #
+    ###########
+
+    def execute(self, sql, parameters=()):
+        """Run a query on the calling thread and return all rows."""
+        if self._reader is None:
+            self._reader = connect(self.path)
+            self._reader_thread = threading.get_ident()
+        return self._reader.execute(sql, parameters).fetchall()
+
+    def _first_session(self, sessions):
+        # id of the earliest of the latest sessions
+        rows = self.execute("SELECT id FROM sessions ORDER BY id DESC LIMIT 1 OFFSET ?",
+                            (sessions - 1,))
+        return rows[0][0] if rows else 0
+
+    def slowest_units(self, limit=50, sessions=1000):
+        """Units with the longest mean time over the latest sessions.
+
+        Returns
+        -------
+
+        List of (unit, mean seconds, count), slowest first.
+
+        """
+
+        return self.execute(
+            "SELECT unit, AVG(seconds) AS mean, COUNT(*) FROM results"
+            " WHERE session_id >= ?"
+            " GROUP BY unit ORDER BY mean DESC LIMIT ?",
+            (self._first_session(sessions), limit))
+
+    def miss_rates_by_week(self, unit=None):
+        """Fraction of results missed, per unit and week.
+
+        Parameters
+        ----------
+
+        unit : str, optional
+
+          Only this unit.  Default is all units.
+
+        Returns
+        -------
+
+        List of (unit, week as 'YYYY-WW', miss rate, count).
+
+        """
+
+        where, parameters = ("WHERE unit = ?", (unit,)) if unit is not None else ("", ())
+        return self.execute(
+            "SELECT unit, week, CAST(missed AS REAL) / results, results FROM unit_weeks " + where +
+            " ORDER BY week, unit",
+            parameters)
+
+    def unit_performance(self, sessions=1000):
+        """Mean time and miss rate of each unit over the latest sessions.
+
+        Returns
+        -------
+
+        dict mapping unit to (mean seconds, miss rate, count).
+
+        """
+
+        rows = self.execute(
+            "SELECT unit, AVG(seconds), AVG(missed), COUNT(*) FROM results"
+            " WHERE session_id >= ?"
+            " GROUP BY unit",
+            (self._first_session(sessions),))
+        return {unit: (seconds, miss_rate, count) for unit, seconds, miss_rate, count in rows}
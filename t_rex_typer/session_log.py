@@ -0,0 +1,199 @@
+import os
+import time
+import struct
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import logging
+log = logging.getLogger(__name__)
+
+
+SESSION_DIRECTORY = os.path.join(
+    os.getenv('XDG_DATA_HOME') or os.path.join(os.path.expanduser("~"), ".local", "share"),
+    "t_rex_typer", "sessions")
+
+# Layout of a session log:
+#
+#   header    MAGIC, VERSION and the wall clock time the log began, ns
+#   records   one per event, see RECORD, each followed by its
+#             content in utf-8
+#
+# Timestamps are time.monotonic_ns so that intervals are exact.
+# Records are only ever appended; a log cut short by a crash is read
+# up to its last complete record.
+MAGIC   = b'TREXSESS'
+VERSION = 1
+HEADER  = struct.Struct('=8sIq')
+RECORD  = struct.Struct('=BqII')  # kind, timestamp, unit index, content length
+
+# kinds of event
+START = 0  # content is the lesson file, if any
+EDIT  = 1  # content is the text of the input
+END   = 2  # lesson finished
+
+# bytes and nanoseconds to hold events for before writing them
+FLUSH_SIZE     = 1 << 16
+FLUSH_INTERVAL = 1_000_000_000
+
+SessionEvent = namedtuple('SessionEvent', 'kind timestamp unit_index content')
+
+
+class SessionError(Exception):
+    """File is not a session log."""
+
+
+def session_path(directory=None):
+    """Path for a new session log, named by the current time."""
+    name = time.strftime('%Y%m%d-%H%M%S') + f"-{time.time_ns() % 1_000_000_000:09d}.trs"
+    return os.path.join(directory or SESSION_DIRECTORY, name)
+
+
+class SessionRecorder:
+    """Append practice events to a session log.
+
+    Recording packs the event into a buffer.  Full buffers are
+    written and flushed by a single worker thread, in order, so the
+    caller never waits on the disk.
+
+    Parameters
+    ----------
+
+    path : str
+
+      Log file to create.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._buffer = bytearray(HEADER.pack(MAGIC, VERSION, time.time_ns()))
+        self._last_flush = time.monotonic_ns()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._file = None
+
+    def record(self, kind, unit_index, content=''):
+        now = time.monotonic_ns()
+        encoded = content.encode('utf-8')
+        self._buffer += RECORD.pack(kind, now, unit_index, len(encoded))
+        self._buffer += encoded
+
+        if len(self._buffer) >= FLUSH_SIZE or now - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Hand the buffered events to the writer."""
+        if self._buffer:
+            self._executor.submit(self._write, bytes(self._buffer))
+            self._buffer.clear()
+        self._last_flush = time.monotonic_ns()
+
+    def _write(self, data):
+        # runs on the worker thread
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, 'ab')
+            self._file.write(data)
+            self._file.flush()
+        except OSError as err:
+            log.warning(f"Could not write session log {self.path}: {err}")
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self, wait=False):
+        """Write the remaining events and close the log.
+
+        Parameters
+        ----------
+
+        wait : bool, optional
+
+          Block until everything is written.  Default is False, the
+          worker finishes in the background.
+
+        """
+
+        self.flush()
+        self._executor.submit(self._close_file)
+        self._executor.shutdown(wait=wait)
+
+
+def read_session(path):
+    """Read the events of a session log.
+
+    Returns
+    -------
+
+    Tuple of the wall clock start time in ns and a list of
+    SessionEvent.
+
+    Raises
+    ------
+
+    SessionError when the file is not a session log.
+
+    """
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    try:
+        magic, version, started = HEADER.unpack_from(data)
+    except struct.error:
+        raise SessionError(f"Truncated header: {path}") from None
+    if magic != MAGIC or version != VERSION:
+        raise SessionError(f"Not a session log or unsupported version: {path}")
+
+    events = []
+    pos = HEADER.size
+    while pos + RECORD.size <= len(data):
+        kind, timestamp, unit_index, length = RECORD.unpack_from(data, pos)
+        pos += RECORD.size
+        if pos + length > len(data):
+            log.debug(f"Session log ends in a partial record: {path}")
+            break
+        content = data[pos:pos + length].decode('utf-8')
+        pos += length
+        events.append(SessionEvent(kind, timestamp, unit_index, content))
+
+    return started, events
+
+
+def replay(events, on_edit, speed=None, sleep=time.sleep):
+    """Feed the edits of a session to a handler.
+
+    Parameters
+    ----------
+
+    events : list
+
+      SessionEvent, as returned by read_session.
+
+    on_edit : callable
+
+      Called with the content of each EDIT event, such as
+      MainWindow.on_line_edit_text_edited.
+
+    speed : float, optional
+
+      Keep the recorded intervals, divided by speed.  Default is
+      None, replay as fast as possible.
+
+    sleep : callable, optional
+
+      Called with the seconds to wait between events.  A GUI may
+      pass something which processes events meanwhile.
+
+    """
+
+    previous = None
+    for event in events:
+        if event.kind != EDIT:
+            continue
+        if speed and previous is not None:
+            sleep((event.timestamp - previous) / 1e9 / speed)
+        previous = event.timestamp
+        on_edit(event.content)
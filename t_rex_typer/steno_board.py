@@ -141,6 +141,15 @@ class StenoBoard(QtWidgets.QWidget):
         self.s_right = Key("S")
         self.z       = Key("Z")
 
+        # keys in steno order, matching stroke_codec.KEYS
+        self.keys = [
+            self.number_bar,
+            self.s_left, self.t_left, self.k, self.p_left, self.w, self.h, self.r_left,
+            self.a, self.o, self.star, self.e, self.u,
+            self.f, self.r_right, self.p_right, self.b, self.l, self.g, self.t_right,
+            self.s_right, self.d, self.z,
+        ]
+
         # left
         self.left_top_layout = QtWidgets.QHBoxLayout()
         self.left_top_layout.setContentsMargins(0, 0, 0, 0)
@@ -230,6 +239,21 @@ class StenoBoard(QtWidgets.QWidget):
 
         self.setLayout(self.board_layout)
 
+    def show_stroke(self, mask, color=QtCore.Qt.gray):
+        """Color the keys of a stroke encoded by stroke_codec.
+
+        Keys not in the stroke are left as they are.
+
+        """
+
+        for i, key in enumerate(self.keys):
+            if mask & (1 << i):
+                key.set_color(color)
+
+    def clear_stroke(self):
+        for key in self.keys:
+            key.set_color(QtCore.Qt.lightGray)
+
 
 if __name__ == '__main__':
     app = QtWidgets.QApplication(sys.argv)
@@ -0,0 +1,142 @@
+from array import array
+from functools import lru_cache
+
+
+# Each key of the steno layout is one bit, in steno order, so a
+# stroke fits in a fixed-width integer and key-level comparisons are
+# bitwise operations.  Bit 0 is the number bar.
+STENO_ORDER = "#STKPWHRAO*EUFRPBLGTSDZ"
+
+KEYS = ('#',
+        'S-', 'T-', 'K-', 'P-', 'W-', 'H-', 'R-',
+        'A-', 'O-', '*', '-E', '-U',
+        '-F', '-R', '-P', '-B', '-L', '-G', '-T', '-S', '-D', '-Z')
+
+KEY_BITS = {key: 1 << i for i, key in enumerate(KEYS)}
+
+# digits are written in place of a key when the number bar is pressed
+NUMBER_KEYS = {'1': 'S-', '2': 'T-', '3': 'P-', '4': 'H-', '5': 'A-',
+               '0': 'O-', '6': '-F', '7': '-P', '8': '-L', '9': '-T'}
+
+# a hyphen moves on to the keys after the star
+RIGHT_START = KEYS.index('-E')
+
+# keys that separate the banks; without one a hyphen is written
+VOWELS = KEY_BITS['A-'] | KEY_BITS['O-'] | KEY_BITS['*'] | KEY_BITS['-E'] | KEY_BITS['-U']
+
+ALL_KEYS = (1 << len(KEYS)) - 1
+
+
+@lru_cache(maxsize=None)
+def encode_stroke(stroke):
+    """Encode a single stroke (e.g. 'STKPW-FRPB') as an integer.
+
+    Keys are matched left to right in steno order, so 'S' before any
+    vowel is S- and after it is -S.
+
+    Raises
+    ------
+
+    ValueError when the stroke is not in steno order or has unknown
+    keys.
+
+    """
+
+    mask = 0
+    pos = 0
+    has_hyphen = False
+    for c in stroke:
+        if c == '-':
+            if has_hyphen or pos > RIGHT_START:
+                raise ValueError(f"Invalid stroke: {stroke!r}")
+            has_hyphen = True
+            pos = RIGHT_START
+            continue
+
+        if c in NUMBER_KEYS:
+            i = KEYS.index(NUMBER_KEYS[c])
+            mask |= KEY_BITS['#']
+            if i < pos:
+                raise ValueError(f"Invalid stroke: {stroke!r}")
+        else:
+            i = STENO_ORDER.find(c, pos)
+            if i == -1:
+                raise ValueError(f"Invalid stroke: {stroke!r}")
+
+        mask |= 1 << i
+        pos = i + 1
+
+    return mask
+
+
+def decode_stroke(mask):
+    """Write an encoded stroke in steno order (e.g. 'STKPW-FRPB')."""
+    letters = []
+    for i, key in enumerate(KEYS):
+        if mask & (1 << i):
+            if i > RIGHT_START + 1 and not mask & VOWELS and '-' not in letters:
+                letters.append('-')
+            letters.append(key.strip('-') or '-')
+    return ''.join(letters)
+
+
+def encode_outline(outline):
+    """Encode a multi-stroke outline (e.g. 'AZ/WEL/AZ') as a tuple."""
+    return tuple(encode_stroke(s) for s in outline.split('/'))
+
+
+def encode_outlines(outlines):
+    """Encode many outlines at once.
+
+    Distinct strokes are parsed once.  Outlines which aren't valid
+    steno are encoded with no strokes.
+
+    Parameters
+    ----------
+
+    outlines : iterable
+
+      Outline strings, such as the keys of a dictionary.
+
+    Returns
+    -------
+
+    Tuple of two arrays, (masks, offsets).  The strokes of outline i
+    are masks[offsets[i]:offsets[i+1]].
+
+    """
+
+    masks = array('I')
+    offsets = array('I', [0])
+    for outline in outlines:
+        try:
+            masks.extend(encode_outline(outline))
+        except ValueError:
+            pass
+        offsets.append(len(masks))
+    return masks, offsets
+
+
+def keys(mask):
+    """Names of the keys in an encoded stroke, in steno order."""
+    return [key for i, key in enumerate(KEYS) if mask & (1 << i)]
+
+
+def difference(typed, expected):
+    """Keys pressed in one stroke but not the other."""
+    return typed ^ expected
+
+
+def missing(typed, expected):
+    """Keys of the expected stroke which were not pressed."""
+    return expected & ~typed
+
+
+def extra(typed, expected):
+    """Keys pressed which are not in the expected stroke."""
+    return typed & ~expected
+
+
+def distance(typed, expected):
+    """Number of keys which differ between two strokes."""
+    return bin(typed ^ expected).count('1')
@@ -11,9 +11,17 @@ log = logging.getLogger(__name__)
 logging.basicConfig(format='%(levelname)s: [%(filename)s:%(lineno)d] %(message)s', level=logging.INFO)
 
 import argparse
+import sqlite3
 import nostalgic
 from enum import Enum
 from .translation_dict import TranslationDict
+from .lesson_units import LessonUnits, utf16_length
+from .latency import LatencyRecorder
+from . import lesson_files
+from .lesson_library import LessonLibrary
+from . import session_log
+from .practice_stats import StatisticsStore
+from .drills import DrillGenerator
 from PySide2 import QtCore, QtWidgets, QtGui
 from .widgets import TabSafeLineEdit, TextLabel
 
@@ -36,6 +44,12 @@ if IS_DEV_DEBUG:
 BLACK = QtGui.QColor(0, 0, 0)
 GRAY  = QtGui.QColor(190, 190, 190)
 
+# The viewer holds a window of the lesson rather than all of it.
+# VIEWER_UNITS more units are laid out whenever fewer than
+# VIEWER_LOOK_AHEAD remain ahead of the current one.
+VIEWER_UNITS      = 200
+VIEWER_LOOK_AHEAD = 100
+
 APPLICATION_NAME       = "T-Rex Typer"
 APPLICATION_ICON_BYTES = pkgutil.get_data(__name__, "resources/trex_w_board_48.png")
 
@@ -51,6 +65,224 @@ class RunState(Enum):
     READY      = 2
 
 
+class LoadCancelled(Exception):
+    pass
+
+
+class DictionaryLoader(QtCore.QObject):
+    """Load dictionaries on a worker thread.
+
+    Move to a QThread and connect the thread's started signal to
+    run.  The result is emitted rather than stored so that it is
+    handed over to the GUI thread in one piece.
+
+    Parameters
+    ----------
+    filenames : list
+
+      Paths of Plover dictionaries.
+
+    """
+
+    progress  = QtCore.Signal(int, int)
+    loaded    = QtCore.Signal(object)
+    failed    = QtCore.Signal(str)
+    cancelled = QtCore.Signal()
+
+    def __init__(self, filenames, parent=None):
+        super().__init__(parent)
+
+        self.filenames = filenames
+        self._is_cancelled = False
+
+    def cancel(self):
+        # called from the GUI thread while run blocks the worker's
+        # event loop, so a flag is used instead of a slot
+        self._is_cancelled = True
+
+    def _on_progress(self, done, total):
+        if self._is_cancelled:
+            raise LoadCancelled
+        self.progress.emit(done, total)
+
+    def run(self):
+        try:
+            dictionary = TranslationDict(self.filenames, progress=self._on_progress)
+        except LoadCancelled:
+            self.cancelled.emit()
+        except Exception as err:
+            self.failed.emit(str(err))
+        else:
+            self.loaded.emit(dictionary)
+
+
+class DictionaryReloader(QtCore.QObject):
+    """Re-read changed dictionaries on a worker thread.
+
+    Only the changed files are parsed.  The resulting changes are
+    emitted, not applied, so that the GUI thread patches the
+    dictionary between lookups.
+
+    Parameters
+    ----------
+    dictionary : TranslationDict
+
+      Dictionary to compute the changes for.
+
+    filenames : list
+
+      Paths of the changed dictionaries.
+
+    """
+
+    reloaded = QtCore.Signal(object)
+    failed   = QtCore.Signal(str)
+
+    def __init__(self, dictionary, filenames, parent=None):
+        super().__init__(parent)
+
+        self.dictionary = dictionary
+        self.filenames = filenames
+
+    def run(self):
+        try:
+            changes = self.dictionary.diff_sources(self.filenames)
+        except Exception as err:
+            self.failed.emit(str(err))
+        else:
+            self.reloaded.emit(changes)
+
+
+class LessonLibraryScanner(QtCore.QObject):
+    """Bring a lesson library up to date on a worker thread.
+
+    Parameters
+    ----------
+    directory : str
+
+      Lesson directory.
+
+    dictionary : TranslationDict
+
+      Dictionary to measure lesson coverage with.
+
+    """
+
+    progress = QtCore.Signal(int, int)
+    indexed  = QtCore.Signal(object)
+    scanned  = QtCore.Signal(object)
+    failed   = QtCore.Signal(str)
+
+    def __init__(self, directory, dictionary, parent=None):
+        super().__init__(parent)
+
+        self.directory = directory
+        self.dictionary = dictionary
+        self._is_cancelled = False
+
+    def cancel(self):
+        # see DictionaryLoader.cancel
+        self._is_cancelled = True
+
+    def _on_progress(self, done, total):
+        if self._is_cancelled:
+            raise LoadCancelled
+        self.progress.emit(done, total)
+
+    def run(self):
+        try:
+            library = LessonLibrary(self.directory)
+            # the stored index, before any lesson is read
+            self.indexed.emit(dict(library.lessons))
+            library.refresh(self.dictionary, progress=self._on_progress)
+        except LoadCancelled:
+            pass
+        except Exception as err:
+            self.failed.emit(str(err))
+        else:
+            self.scanned.emit(library.lessons)
+
+
+class LessonLibraryWindow(QtWidgets.QWidget):
+    """Sortable table of the lessons in the lesson directory."""
+
+    COLUMNS = ('Lesson', 'Words', 'Distinct units', 'Coverage %')
+
+    lesson_chosen = QtCore.Signal(str)
+    refresh_requested = QtCore.Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.setWindowTitle(f'{APPLICATION_NAME} Lesson Library')
+        self.setWindowFlags(self.windowFlags() & ~QtCore.Qt.WindowContextHelpButtonHint)
+
+        self.directory = ''
+
+        self.init_widgets()
+        self.init_layout()
+
+    def init_widgets(self):
+        self.table = QtWidgets.QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        self.table.setSortingEnabled(True)
+        self.table.itemDoubleClicked.connect(self.on_table_item_double_clicked)
+
+        self.status_label = QtWidgets.QLabel('')
+
+        self.refresh_button = QtWidgets.QPushButton("Refresh")
+        self.refresh_button.pressed.connect(self.refresh_requested)
+
+    def init_layout(self):
+        self.bottom_layout = QtWidgets.QHBoxLayout()
+        self.bottom_layout.addWidget(self.status_label, stretch=1)
+        self.bottom_layout.addWidget(self.refresh_button)
+
+        self.layout = QtWidgets.QVBoxLayout()
+        self.layout.addWidget(self.table, stretch=1)
+        self.layout.addLayout(self.bottom_layout)
+        self.setLayout(self.layout)
+
+    def set_scanning(self, done=0, total=0):
+        self.refresh_button.setEnabled(False)
+        self.status_label.setText(f"Reading lessons.. {done}/{total}" if total else "Scanning..")
+
+    def set_lessons(self, directory, lessons):
+        self.directory = directory
+
+        # sorting while filling moves rows under the loop
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(lessons))
+        for row, (path, entry) in enumerate(lessons.items()):
+            name = QtWidgets.QTableWidgetItem(os.path.relpath(path, directory))
+            name.setData(QtCore.Qt.UserRole, path)
+            coverage = entry['coverage']
+            values = (entry['words'], entry['distinct_units'],
+                      round(coverage * 100, 1) if coverage is not None else None)
+
+            self.table.setItem(row, 0, name)
+            for column, value in enumerate(values, 1):
+                item = QtWidgets.QTableWidgetItem()
+                if value is not None:
+                    # numbers sort as numbers
+                    item.setData(QtCore.Qt.DisplayRole, value)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+
+        self.refresh_button.setEnabled(True)
+        self.status_label.setText(f"{len(lessons)} lessons")
+
+    def on_table_item_double_clicked(self, item):
+        self.lesson_chosen.emit(self.table.item(item.row(), 0).data(QtCore.Qt.UserRole))
+
+    def closeEvent(self, event):
+        self.hide()
+
+
 class SettingsWindow(QtWidgets.QWidget):
 
     def __init__(self, parent=None):
@@ -264,14 +496,52 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setWindowTitle(APPLICATION_NAME)
         self.setWindowFlags(self.windowFlags() & ~QtCore.Qt.WindowContextHelpButtonHint)
 
-        self._dictionary = {}
+        self._dictionary = TranslationDict()
         self.lesson_file = None
 
-        self.text_raw     = ''
-        self.text_split   = ()
-        self.live_split   = []
+        self.library_thread  = None
+        self.library_scanner = None
+        # a scan asked for while a reload was running
+        self.is_library_scan_pending = False
+
+        # log of the current practice run, opened on its first edit
+        self.session = None
+
+        # per-unit results, written in batches by a worker thread
+        self.statistics    = StatisticsStore()
+        self.unit_started  = 0
+        self.unit_attempts = 1
+        self.unit_typed    = False
+
+        # vocabulary of the dictionary, read on the first drill
+        self.drill_generator = None
+
+        # pieces of a lesson file still to be added to the editor
+        self.lesson_chunks = None
+        self.is_lesson_started = False
+
+        self.dictionary_thread = None
+        self.dictionary_loader = None
+
+        self.reload_thread   = None
+        self.reload_worker   = None
+        self.pending_reloads = set()
+        self.dictionary_mtimes = {}
+
+        self.text_split   = LessonUnits()
         self.current_unit = ''
 
+        # index of the current unit in text_split and its position
+        # in the viewer
+        self.unit_index    = 0
+        self.unit_position = 0
+
+        # units up to viewer_end are in the viewer
+        self.viewer_end = 0
+
+        # whether each character of the current unit is shown as typed
+        self.unit_matched = []
+
         self.missed      = 0
         self.last_time   = 0
         self.maybe_miss  = False
@@ -359,6 +629,16 @@ class MainWindow(QtWidgets.QMainWindow):
         self.save_as_action.setEnabled(False)
         self.save_as_action.triggered.connect(self.on_save_as)
 
+        self.lesson_library_action = QtWidgets.QAction('Lesson &Library..', self)
+        self.lesson_library_action.setShortcut('Ctrl+L')
+        self.lesson_library_action.setToolTip('Browse the lessons in the lesson directory')
+        self.lesson_library_action.triggered.connect(self.on_lesson_library_action)
+
+        self.drill_action = QtWidgets.QAction('Generate &Drill', self)
+        self.drill_action.setShortcut('Ctrl+D')
+        self.drill_action.setToolTip('Practice the words of the dictionary you are weakest at')
+        self.drill_action.triggered.connect(self.on_drill_action)
+
         self.load_dictionary_action = QtWidgets.QAction('Load Dictionary..', self)
         self.load_dictionary_action.setToolTip('Load and replace the current dictionary')
         self.load_dictionary_action.triggered.connect(self.on_load_dictionary)
@@ -381,6 +661,8 @@ class MainWindow(QtWidgets.QMainWindow):
         self.file_menu.setToolTipsVisible(True)
         self.file_menu.aboutToShow.connect(self.on_file_menu_about_to_show)
         self.file_menu.addAction(self.open_action)
+        self.file_menu.addAction(self.lesson_library_action)
+        self.file_menu.addAction(self.drill_action)
         self.file_menu.addAction(self.save_action)
         self.file_menu.addAction(self.save_as_action)
         self.file_menu.addSeparator()
@@ -400,6 +682,10 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # no parent so that a separate window is used
         self.about_window = AboutWindow()
+
+        self.lesson_library_window = LessonLibraryWindow()
+        self.lesson_library_window.lesson_chosen.connect(self.open_lesson)
+        self.lesson_library_window.refresh_requested.connect(self._scan_lesson_library)
         self.settings_window = SettingsWindow()
 
         # Text viewer
@@ -419,11 +705,49 @@ class MainWindow(QtWidgets.QMainWindow):
         self.text_editor = QtWidgets.QTextEdit()
         self.text_editor.setPlaceholderText('Put practice words here..')
         self.text_editor.textChanged.connect(self.on_text_edit_changed)
+        self.text_editor.document().contentsChange.connect(self.on_text_edit_contents_change)
+
+        # the viewer is rebuilt once typing in the editor pauses
+        self.lesson_reset_timer = QtCore.QTimer(self)
+        self.lesson_reset_timer.setSingleShot(True)
+        self.lesson_reset_timer.setInterval(300)
+        self.lesson_reset_timer.timeout.connect(self._reset)
+
+        # lesson files are added to the editor a piece at a time,
+        # between events
+        self.lesson_load_timer = QtCore.QTimer(self)
+        self.lesson_load_timer.setInterval(0)
+        self.lesson_load_timer.timeout.connect(self.on_lesson_load_timer_timeout)
 
         # start
         self.restart_button = QtWidgets.QPushButton("Restart")
         self.restart_button.pressed.connect(self.on_restart_button_pressed)
 
+        # Dictionary loading progress
+        self.load_progress_bar = QtWidgets.QProgressBar()
+        self.load_progress_bar.setMaximumWidth(150)
+        self.load_progress_bar.setVisible(False)
+
+        self.load_cancel_button = QtWidgets.QPushButton("Cancel")
+        self.load_cancel_button.setToolTip('Stop loading dictionaries')
+        self.load_cancel_button.setVisible(False)
+        self.load_cancel_button.pressed.connect(self.on_load_cancel_button_pressed)
+
+        self.statusBar().addPermanentWidget(self.load_progress_bar)
+        self.statusBar().addPermanentWidget(self.load_cancel_button)
+
+        # Dictionary hot reload.  Editors often save several times or
+        # replace the file, so changes are collected for a moment
+        # before reloading.
+        self.dictionary_watcher = QtCore.QFileSystemWatcher(self)
+        self.dictionary_watcher.fileChanged.connect(self.on_dictionary_file_changed)
+        self.dictionary_watcher.directoryChanged.connect(self.on_dictionary_directory_changed)
+
+        self.reload_timer = QtCore.QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(500)
+        self.reload_timer.timeout.connect(self.on_reload_timer_timeout)
+
         if IS_DEV_DEBUG:
             text = ("It's the case that every effort has been made to 'replicate' this text as"
                     "faithfully as possible, including inconsistencies in spelling"
@@ -601,16 +925,55 @@ class MainWindow(QtWidgets.QMainWindow):
             dir=self.settings.lesson_directory,
             filter='Text Files (*.txt);;All (*.*)')
 
+        if filename:
+            self.open_lesson(filename)
+
+    def open_lesson(self, filename):
         try:
-            with open(filename, 'r') as f:
-                trimmed_content = f.read()
+            chunks = lesson_files.read_lesson_chunks(filename)
+        except OSError as err:
+            log.warning(f"Could not open lesson: {err}")
+            return
 
-            self.text_editor.setPlainText(trimmed_content)
-            self.lesson_file = filename
-            self.settings.lesson_directory = os.path.dirname(filename)
+        self._stop_lesson_load()
+
+        self.lesson_file = filename
+        self.settings.lesson_directory = os.path.dirname(filename)
+
+        # Practice starts with the first piece while the rest is
+        # added.  Undo history isn't kept for the load.
+        self.text_editor.document().setUndoRedoEnabled(False)
+        self.text_editor.clear()
+        self.lesson_chunks = chunks
+        self.is_lesson_started = False
+        self.lesson_load_timer.start()
+        self.statusBar().showMessage("Loading lesson..")
+
+    def on_lesson_load_timer_timeout(self):
+        chunk = next(self.lesson_chunks, None)
+        if chunk is None:
+            self._stop_lesson_load()
+            self.text_editor.document().setModified(False)
             self.set_window_title(self.lesson_file)
-        except (FileNotFoundError):
-            pass
+            self.statusBar().showMessage("Loaded lesson", 3000)
+            return
+
+        cursor = QtGui.QTextCursor(self.text_editor.document())
+        cursor.movePosition(QtGui.QTextCursor.End)
+        cursor.insertText(chunk)
+
+        # later pieces only add units after the current one
+        if not self.is_lesson_started and self.text_split:
+            self.is_lesson_started = True
+            self.lesson_reset_timer.stop()
+            self._reset()
+
+    def _stop_lesson_load(self):
+        self.lesson_load_timer.stop()
+        if self.lesson_chunks is not None:
+            self.lesson_chunks.close()
+            self.lesson_chunks = None
+            self.text_editor.document().setUndoRedoEnabled(True)
 
     def _save_file(self, filename):
         text = self.text_editor.toPlainText()
@@ -645,10 +1008,173 @@ class MainWindow(QtWidgets.QMainWindow):
             self,
             caption='Open one or more Plover dictionary files',
             dir=self.settings.dictionary_directory,
-            filter='JSON Files (*.json);;All (*.*)')
+            filter='Dictionaries (*.json *.rtf *.gz *.bz2 *.xz);;All (*.*)')
 
-        self._dictionary = TranslationDict.load(filenames)
-        log.debug(f"Loaded dictionaries: {filenames}")
+        if not filenames:
+            return
+
+        # Parsing happens on a worker thread so that practice on the
+        # current lesson continues with the old dictionary.
+        self.dictionary_thread = QtCore.QThread()
+        self.dictionary_loader = DictionaryLoader(filenames)
+        self.dictionary_loader.moveToThread(self.dictionary_thread)
+
+        self.dictionary_thread.started.connect(self.dictionary_loader.run)
+        self.dictionary_loader.progress.connect(self.on_dictionary_load_progress)
+        self.dictionary_loader.loaded.connect(self.on_dictionary_loaded)
+        self.dictionary_loader.failed.connect(self.on_dictionary_load_failed)
+        self.dictionary_loader.cancelled.connect(self.on_dictionary_load_cancelled)
+        for signal in (self.dictionary_loader.loaded,
+                       self.dictionary_loader.failed,
+                       self.dictionary_loader.cancelled):
+            signal.connect(self.dictionary_thread.quit)
+        self.dictionary_thread.finished.connect(self.on_dictionary_thread_finished)
+
+        self.load_dictionary_action.setEnabled(False)
+        self.load_progress_bar.setRange(0, 0)  # busy until first file
+        self.load_progress_bar.setVisible(True)
+        self.load_cancel_button.setEnabled(True)
+        self.load_cancel_button.setVisible(True)
+        self.statusBar().showMessage("Loading dictionaries..")
+
+        self.dictionary_thread.start()
+
+    def on_dictionary_load_progress(self, done, total):
+        self.load_progress_bar.setRange(0, total)
+        self.load_progress_bar.setValue(done)
+
+    def on_dictionary_loaded(self, dictionary):
+        # a single assignment on the GUI thread; lookups see either
+        # the old dictionary or the new one
+        self._dictionary = dictionary
+        self.drill_generator = None
+        self.statusBar().showMessage("Loaded dictionaries", 3000)
+        log.debug(f"Loaded dictionaries: {self.dictionary_loader.filenames}")
+        self._watch_dictionaries(self.dictionary_loader.filenames)
+
+    def on_dictionary_load_failed(self, message):
+        self.statusBar().clearMessage()
+        self.message_box = QtWidgets.QMessageBox()
+        self.message_box.setText('Error loading dictionary: ' + message)
+        self.message_box.show()
+
+    def on_dictionary_load_cancelled(self):
+        self.statusBar().showMessage("Dictionary loading cancelled", 3000)
+        log.debug("Dictionary loading cancelled")
+
+    def on_load_cancel_button_pressed(self):
+        if self.dictionary_loader:
+            self.dictionary_loader.cancel()
+            self.load_cancel_button.setEnabled(False)
+            self.statusBar().showMessage("Cancelling..")
+
+    def on_dictionary_thread_finished(self):
+        self.load_progress_bar.setVisible(False)
+        self.load_cancel_button.setVisible(False)
+        self.load_dictionary_action.setEnabled(True)
+
+        self.dictionary_loader.deleteLater()
+        self.dictionary_thread.deleteLater()
+        self.dictionary_loader = None
+        self.dictionary_thread = None
+
+        # changes seen while loading apply to the new dictionary
+        if self.pending_reloads:
+            self.reload_timer.start()
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _watch_dictionaries(self, filenames):
+        watched = self.dictionary_watcher.files() + self.dictionary_watcher.directories()
+        if watched:
+            self.dictionary_watcher.removePaths(watched)
+        self.pending_reloads.clear()
+
+        self.dictionary_mtimes = {path: self._mtime(path) for path in filenames}
+        self.dictionary_watcher.addPaths(filenames)
+
+        # files replaced on save are noticed through their directory
+        directories = {os.path.dirname(os.path.abspath(path)) for path in filenames}
+        if self.settings.dictionary_directory and os.path.isdir(self.settings.dictionary_directory):
+            directories.add(self.settings.dictionary_directory)
+        self.dictionary_watcher.addPaths(sorted(directories))
+
+    def on_dictionary_file_changed(self, path):
+        # a replaced file is dropped by the watcher
+        if path not in self.dictionary_watcher.files() and os.path.exists(path):
+            self.dictionary_watcher.addPath(path)
+
+        mtime = self._mtime(path)
+        if mtime is not None and mtime != self.dictionary_mtimes.get(path):
+            self.dictionary_mtimes[path] = mtime
+            self.pending_reloads.add(path)
+            self.reload_timer.start()
+
+    def on_dictionary_directory_changed(self, directory):
+        for path in self.dictionary_mtimes:
+            self.on_dictionary_file_changed(path)
+
+    def on_reload_timer_timeout(self):
+        # One load or reload at a time, and none while the lesson
+        # library is scanned with the dictionary: the changes are
+        # applied on this thread while the scanner looks strokes up on
+        # its own.  Try again once it finishes.
+        if self.dictionary_thread or self.reload_thread or self.library_thread:
+            return
+
+        filenames = sorted(self.pending_reloads)
+        self.pending_reloads.clear()
+        if not filenames:
+            return
+
+        self.reload_thread = QtCore.QThread()
+        self.reload_worker = DictionaryReloader(self._dictionary, filenames)
+        self.reload_worker.moveToThread(self.reload_thread)
+
+        self.reload_thread.started.connect(self.reload_worker.run)
+        self.reload_worker.reloaded.connect(self.on_dictionary_reloaded)
+        self.reload_worker.failed.connect(self.on_dictionary_reload_failed)
+        for signal in (self.reload_worker.reloaded, self.reload_worker.failed):
+            signal.connect(self.reload_thread.quit)
+        self.reload_thread.finished.connect(self.on_reload_thread_finished)
+
+        self.statusBar().showMessage("Reloading dictionaries..")
+        self.reload_thread.start()
+
+    def on_dictionary_reloaded(self, changes):
+        # A dictionary loaded meanwhile replaces the one the changes
+        # were computed for.
+        if self.reload_worker.dictionary is not self._dictionary:
+            return
+
+        # applied in one go on the GUI thread; lookups see the
+        # dictionary either before or after all of the changes
+        self._dictionary.apply_changes(changes)
+        self.drill_generator = None
+        self.statusBar().showMessage(f"Reloaded dictionaries ({len(changes)} changes)", 3000)
+        log.debug(f"Reloaded {self.reload_worker.filenames}: {len(changes)} changes")
+
+    def on_dictionary_reload_failed(self, message):
+        # usually a file caught halfway through being saved; the
+        # next save triggers another reload
+        self.statusBar().showMessage('Error reloading dictionary: ' + message, 5000)
+        log.warning(f"Could not reload {self.reload_worker.filenames}: {message}")
+
+    def on_reload_thread_finished(self):
+        self.reload_worker.deleteLater()
+        self.reload_thread.deleteLater()
+        self.reload_worker = None
+        self.reload_thread = None
+
+        if self.pending_reloads:
+            self.reload_timer.start()
+        elif self.is_library_scan_pending:
+            self._scan_lesson_library()
 
     def on_settings_action(self):
         non_application_keys = [k for k in self.settings._settings.keys() if k[:12] != 'application_']
@@ -659,21 +1185,120 @@ class MainWindow(QtWidgets.QMainWindow):
         self.settings_window.raise_()
         self.settings_window.activateWindow()
 
+    def on_lesson_library_action(self):
+        self.lesson_library_window.show()
+        self.lesson_library_window.raise_()
+        self.lesson_library_window.activateWindow()
+        self._scan_lesson_library()
+
+    def _scan_lesson_library(self):
+        directory = self.settings.lesson_directory
+        if self.library_thread or not directory or not os.path.isdir(directory):
+            return
+
+        # a reload may patch the dictionary while the scanner reads it
+        if self.reload_thread:
+            self.is_library_scan_pending = True
+            return
+        self.is_library_scan_pending = False
+
+        # the stored index is shown at once while new and changed
+        # lessons are read on a worker thread
+        self.library_thread = QtCore.QThread()
+        self.library_scanner = LessonLibraryScanner(directory, self._dictionary)
+        self.library_scanner.moveToThread(self.library_thread)
+
+        self.library_thread.started.connect(self.library_scanner.run)
+        self.library_scanner.progress.connect(self.lesson_library_window.set_scanning)
+        self.library_scanner.indexed.connect(self.on_lesson_library_indexed)
+        self.library_scanner.scanned.connect(self.on_lesson_library_scanned)
+        self.library_scanner.failed.connect(self.on_lesson_library_scan_failed)
+        for signal in (self.library_scanner.scanned, self.library_scanner.failed):
+            signal.connect(self.library_thread.quit)
+        self.library_thread.finished.connect(self.on_library_thread_finished)
+
+        self.lesson_library_window.set_scanning()
+        self.library_thread.start()
+
+    def on_lesson_library_indexed(self, lessons):
+        self.lesson_library_window.set_lessons(self.library_scanner.directory, lessons)
+        self.lesson_library_window.set_scanning()
+
+    def on_lesson_library_scanned(self, lessons):
+        self.lesson_library_window.set_lessons(self.library_scanner.directory, lessons)
+
+    def on_lesson_library_scan_failed(self, message):
+        log.warning(f"Could not scan lessons: {message}")
+        self.lesson_library_window.set_lessons(self.library_scanner.directory, {})
+        self.lesson_library_window.status_label.setText('Error scanning lessons: ' + message)
+
+    def on_library_thread_finished(self):
+        self.library_scanner.deleteLater()
+        self.library_thread.deleteLater()
+        self.library_scanner = None
+        self.library_thread = None
+
+        if self.pending_reloads:
+            self.reload_timer.start()
+
+    def on_drill_action(self):
+        try:
+            if self.drill_generator is None:
+                self.drill_generator = DrillGenerator(self._dictionary)
+        except ValueError as err:
+            self.statusBar().showMessage(f"Cannot generate drill: {err}", 5000)
+            return
+
+        # results of the current run count once the worker has
+        # written them
+        self.statistics.flush()
+        try:
+            performance = self.statistics.unit_performance()
+        except (sqlite3.Error, OSError) as err:
+            log.warning(f"Could not read practice statistics: {err}")
+            performance = None
+        self.drill_generator.weigh(performance)
+
+        self._stop_lesson_load()
+        self.lesson_file = None
+        self.text_editor.setPlainText(' '.join(self.drill_generator.generate()))
+        self.lesson_reset_timer.stop()
+        self._reset()
+        self.set_window_title('Drill')
+
     def on_about_action(self):
         self.about_window.show()
         self.about_window.raise_()
         self.about_window.activateWindow()
 
+    def _end_session(self, wait=False):
+        if self.session:
+            self.session.close(wait=wait)
+            self.session = None
+
+    def _record_edit(self, content):
+        if self.session is None:
+            self.session = session_log.SessionRecorder(session_log.session_path())
+            self.session.record(session_log.START, self.unit_index, self.lesson_file or '')
+            self.statistics.begin_session(self.lesson_file)
+            self.unit_started = time.monotonic()
+        self.session.record(session_log.EDIT, self.unit_index, content)
+
     def _reset(self):
+        self._end_session()
         self.text_viewer.clear()
         self.line_edit.clear()
         self.missed = 0
         self.last_time = 0
         self.is_new_unit = True
+        self.unit_attempts = 1
+        self.unit_typed = False
 
         if self.text_split:
-            self.live_split   = list(self.text_split)
-            self.current_unit = self.text_split[0]
+            self.unit_index    = 0
+            self.unit_position = 0
+            self.current_unit  = self.text_split[0]
+            self.unit_matched  = [False] * len(self.current_unit)
 
             cursor = self.text_viewer.textCursor()
             cursor.setPosition(0)
@@ -681,15 +1306,97 @@ class MainWindow(QtWidgets.QMainWindow):
             text_format.setForeground(QtGui.QBrush(BLACK))
             text_format.setFontUnderline(True)
             cursor.insertText(self.current_unit, text_format)
-            text_format.setFontUnderline(False)
-            cursor.insertText(' '+' '.join(self.text_split[1:]), text_format)
+            self.viewer_end = 1
+            self._extend_viewer()
             cursor.setPosition(0)
             self.text_viewer.setTextCursor(cursor)
+            self.text_viewer.horizontalScrollBar().setValue(0)
 
             self.line_edit.setEnabled(True)
 
             self.run_state = RunState.READY
 
+    def _format_unit(self, color, underline):
+        # restyle the current unit in the viewer, leaving the text
+        cursor = QtGui.QTextCursor(self.text_viewer.document())
+        cursor.setPosition(self.unit_position)
+        cursor.setPosition(self.unit_position + utf16_length(self.current_unit), QtGui.QTextCursor.KeepAnchor)
+        text_format = QtGui.QTextCharFormat()
+        text_format.setForeground(QtGui.QBrush(color))
+        text_format.setFontUnderline(underline)
+        cursor.mergeCharFormat(text_format)
+
+    def _color_unit(self, typed):
+        # Gray the characters of the current unit typed correctly and
+        # black the rest.  Only runs of characters whose state changed
+        # since the last call are restyled.  Viewer positions count
+        # UTF-16 code units, not characters.
+        unit = self.current_unit
+        matched = [i < len(typed) and typed[i] == c for i, c in enumerate(unit)]
+        offset = (lambda i: i) if unit.isascii() else (lambda i: utf16_length(unit[:i]))
+
+        cursor = QtGui.QTextCursor(self.text_viewer.document())
+        text_format = QtGui.QTextCharFormat()
+        i = 0
+        while i < len(matched):
+            if matched[i] == self.unit_matched[i]:
+                i += 1
+                continue
+
+            j = i + 1
+            while j < len(matched) and matched[j] == matched[i] and matched[j] != self.unit_matched[j]:
+                j += 1
+
+            cursor.setPosition(self.unit_position + offset(i))
+            cursor.setPosition(self.unit_position + offset(j), QtGui.QTextCursor.KeepAnchor)
+            text_format.setForeground(QtGui.QBrush(GRAY if matched[i] else BLACK))
+            cursor.mergeCharFormat(text_format)
+            i = j
+
+        self.unit_matched = matched
+        return matched
+
+    def _extend_viewer(self):
+        # lay out the next units of the lesson after those shown
+        end = min(self.viewer_end + VIEWER_UNITS, len(self.text_split))
+        if end == self.viewer_end:
+            return
+
+        cursor = QtGui.QTextCursor(self.text_viewer.document())
+        cursor.movePosition(QtGui.QTextCursor.End)
+        text_format = QtGui.QTextCharFormat()
+        text_format.setForeground(QtGui.QBrush(BLACK))
+        cursor.insertText(' '+' '.join(self.text_split[self.viewer_end:end]), text_format)
+        self.viewer_end = end
+
+    def _advance_unit(self):
+        # Units are only removed from the viewer a window at a time.
+        # The finished unit is grayed out, the next one underlined
+        # and scrolled to the left edge, so the cost doesn't depend on
+        # the lesson length.
+        self._format_unit(GRAY, False)
+
+        # positions in the viewer count UTF-16 code units
+        self.unit_position += utf16_length(self.current_unit) + 1
+        self.unit_index += 1
+        self.current_unit = self.text_split[self.unit_index]
+        self.unit_matched = [False] * len(self.current_unit)
+
+        if self.viewer_end - self.unit_index < VIEWER_LOOK_AHEAD:
+            # drop the finished units and prefetch more
+            cursor = QtGui.QTextCursor(self.text_viewer.document())
+            cursor.setPosition(self.unit_position, QtGui.QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+            self.unit_position = 0
+            self._extend_viewer()
+
+        self._format_unit(BLACK, True)
+
+        cursor = QtGui.QTextCursor(self.text_viewer.document())
+        cursor.setPosition(self.unit_position)
+        scroll_bar = self.text_viewer.horizontalScrollBar()
+        scroll_bar.setValue(scroll_bar.value() + self.text_viewer.cursorRect(cursor).left())
+
     def on_text_edit_changed(self):
 
         title = ''
@@ -703,10 +1410,34 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.save_as_action.setEnabled(True)
 
-        self.text_raw   = self.text_editor.toPlainText()
-        self.text_split = tuple(TranslationDict.split_into_strokable_units(self.text_raw))
+        # a lesson being loaded resets once, on its first piece
+        if self.lesson_chunks is None:
+            self.lesson_reset_timer.start()
 
-        self._reset()
+    def on_text_edit_contents_change(self, position, removed, added):
+        # Re-split only the edited text, widened to whitespace so
+        # that no unit is cut.
+        document = self.text_editor.document()
+
+        # the count excludes the final paragraph separator, which
+        # replacing the whole document also reports
+        length = document.characterCount() - 1
+        added = min(added, length - position)
+
+        start = position
+        while start > 0 and not document.characterAt(start - 1).isspace():
+            start -= 1
+
+        end = position + added
+        while end < length and not document.characterAt(end).isspace():
+            end += 1
+
+        cursor = QtGui.QTextCursor(document)
+        cursor.setPosition(start)
+        cursor.setPosition(end, QtGui.QTextCursor.KeepAnchor)
+        text = cursor.selectedText().replace('\u2029', '\n')
+
+        self.text_split.replace(start, end - added + removed, text)
 
     def on_restart_button_pressed(self):
         self._reset()
@@ -718,6 +1449,8 @@ class MainWindow(QtWidgets.QMainWindow):
         elif self.run_state != RunState.PRACTICING:
             self.run_state = RunState.PRACTICING
 
+        self._record_edit(content)
+
         self.is_new_unit = False
 
         delta = abs(time.time()-self.last_time)
@@ -753,35 +1486,30 @@ class MainWindow(QtWidgets.QMainWindow):
         line_edit_cursor_index = self.line_edit.cursorPosition() - 1
 
         cursor = QtGui.QTextCursor(self.text_viewer.document())
-        text_format = cursor.charFormat()
 
         if trimmed_content:
 
             # match; advance or finish
             if trimmed_content == self.current_unit:
-                self.live_split.pop(0)
-                self.text_viewer.clear()
+                now = time.monotonic()
+                self.statistics.add_result(self.unit_index, self.current_unit,
+                                           now - self.unit_started, self.is_miss, self.unit_attempts)
+                self.unit_started  = now
+                self.unit_attempts = 1
+                self.unit_typed    = False
 
                 self.maybe_miss  = False
                 self.is_miss     = False
                 self.is_new_unit = True
 
                 # advance to next unit
-                if self.live_split:
-                    self.current_unit = self.live_split[0]
-
-                    text_format.setFontUnderline(True)
-                    text_format.setForeground(QtGui.QBrush(BLACK))
-                    cursor.setCharFormat(text_format)
-                    cursor.insertText(self.current_unit)
-                    text_format.setFontUnderline(False)
-                    cursor.setCharFormat(text_format)
-                    cursor.insertText(' '+' '.join(self.live_split[1:]))
-
+                if self.unit_index + 1 < len(self.text_split):
+                    self._advance_unit()
                     self.line_edit.clear()
 
                 # finish
                 else:
+                    self.text_viewer.clear()
                     total_number_units = len(self.text_split)
                     correct = (total_number_units - self.missed)
                     accuracy = correct / total_number_units
@@ -790,28 +1518,21 @@ class MainWindow(QtWidgets.QMainWindow):
                     self.line_edit.setEnabled(False)
                     self.run_state = RunState.COMPLETE
 
+                    self.session.record(session_log.END, self.unit_index)
+                    self._end_session()
+                    self.statistics.flush()
+
             # contents don't match current unit
             else:
                 if not self.is_miss and len(trimmed_content) > len(self.current_unit):
                     self.maybe_miss = True
 
-                cursor.setPosition(1)
-
-                for i, c in enumerate(self.current_unit):
-                    color = BLACK
+                self.unit_typed = True
+                matched = self._color_unit(trimmed_content)
 
-                    if i < len(trimmed_content):
-                        if trimmed_content[i] == c:
-                            color = GRAY
-                        else:
-                            # contents have non-matching char
-                            if not self.is_miss:
-                                self.maybe_miss = True
-
-                    cursor.deletePreviousChar()
-                    text_format.setForeground(QtGui.QBrush(color))
-                    cursor.insertText(c, text_format)
-                    cursor.setPosition(cursor.position()+1)
+                # contents have non-matching char
+                if not self.is_miss and not all(matched[:len(trimmed_content)]):
+                    self.maybe_miss = True
 
         # no content–user deleted all input.
         else:
@@ -819,14 +1540,31 @@ class MainWindow(QtWidgets.QMainWindow):
                 # already started and then returned to position 0
                 self.maybe_miss = True
 
-            # recolor first char
-            cursor.setPosition(1)
-            cursor.deletePreviousChar()
-            text_format.setForeground(QtGui.QBrush(BLACK))
-            cursor.insertText(self.current_unit[0], text_format)
+            # typed something and took it all back
+            if self.unit_typed:
+                self.unit_attempts += 1
+                self.unit_typed = False
+
+            self._color_unit('')
 
         # print(f"maybe: {self.maybe_miss}", flush=True)
 
+    def record_latency(self, recorder):
+        # Time each edit of the input from the start of its handler
+        # to the end of the handler and to the next paint of the
+        # viewer.  Slots run in the order connected, so these wrap
+        # on_line_edit_text_edited.
+        self.line_edit.textEdited.disconnect(self.on_line_edit_text_edited)
+        self.line_edit.textEdited.connect(lambda: recorder.start())
+        self.line_edit.textEdited.connect(self.on_line_edit_text_edited)
+        self.line_edit.textEdited.connect(lambda: self._on_text_edited_handled(recorder))
+        self.text_viewer.painted.connect(lambda: recorder.stop('paint'))
+
+    def _on_text_edited_handled(self, recorder):
+        recorder.lap('handler')
+        # paint even when the edit didn't change the viewer
+        self.text_viewer.viewport().update()
+
     def _load_settings(self, sync=True):
         self.settings.read(sync=sync)
         log.info(f"Loaded settings: {self.settings.config_file}")
@@ -840,10 +1578,29 @@ class MainWindow(QtWidgets.QMainWindow):
         # destroyed
         self._save_settings(sync=True)
 
+        self._end_session(wait=True)
+        self.statistics.close(wait=True)
+
+        # let a dictionary load stop before the thread is destroyed
+        if self.dictionary_thread:
+            self.dictionary_loader.cancel()
+            self.dictionary_thread.quit()
+            self.dictionary_thread.wait()
+        if self.reload_thread:
+            self.reload_thread.quit()
+            self.reload_thread.wait()
+        if self.library_thread:
+            self.library_scanner.cancel()
+            self.library_thread.quit()
+            self.library_thread.wait()
+
         # since MainWindow is not parent, must close manually
         self.about_window.close()
         del self.about_window
 
+        self.lesson_library_window.close()
+        del self.lesson_library_window
+
         self.settings_window.close()
         del self.settings_window
 
@@ -855,6 +1612,9 @@ def main():
     parser.add_argument("--log-level",
                         help="set log level.  Default is 'info'.  Use 'debug' for more logging.",
                         choices=['info', 'debug'], type=str)
+    parser.add_argument("--latency-log", metavar="FILE",
+                        help="time each input edit until the lesson is repainted and "
+                        "write percentiles and histograms to FILE on exit.")
     args = parser.parse_args()
 
     if IS_DEV_DEBUG or args.log_level == 'debug':
@@ -872,4 +1632,14 @@ def main():
     main_window = MainWindow()
     main_window.show()
 
-    sys.exit(app.exec_())
+    recorder = None
+    if args.latency_log:
+        recorder = LatencyRecorder()
+        main_window.record_latency(recorder)
+
+    status = app.exec_()
+
+    if recorder:
+        recorder.write(args.latency_log)
+
+    sys.exit(status)
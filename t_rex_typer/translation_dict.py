@@ -1,12 +1,250 @@
 import re
-import json
+import time
+import types
+import hashlib
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+import logging
+log = logging.getLogger(__name__)
+
+from . import stroke_codec
+from . import dictionary_cache
+from . import dictionary_parsers
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 
 # single quotes are used in two ways. First, as apostrophes in the
 # middle of a string of characters. Second at the boundary of a unit
-# as a quote or as an abbreviation.  Exclude single quotes and parse
-# these out later.
-UNIT_REGEX = r"[\w']+|[{}()\[\]~`!@#$%^&*-_+=|\/.,:;\"]"
+# as a quote or as an abbreviation.  Only apostrophes between word
+# characters belong to a word; any other single quote is a unit of
+# its own.  Each symbol is a unit.
+UNIT_REGEX = r"\w+(?:'+\w+)*|'|[{}()\[\]~`!@#$%^&*\-_+=|\\/.,:;\"?<>]"
+UNIT_PATTERN = re.compile(UNIT_REGEX)
+
+# size of the pieces iter_strokable_units splits at a time
+UNIT_CHUNK_SIZE = 1 << 16
+WHITESPACE = re.compile(r"\s")
+
+
+def _whitespace_before(text, start, end):
+    # position just after the last whitespace in text[start:end], or
+    # start when there is none
+    return max(text.rfind(' ', start, end), text.rfind('\n', start, end),
+               text.rfind('\t', start, end), start - 1) + 1
+
+
+def read_dictionary(path, into=None):
+    """Parse one Plover dictionary.
+
+    The format (Plover json or RTF/CRE, optionally gzip, bz2 or xz
+    compressed) is chosen by dictionary_parsers.
+
+    Parameters
+    ----------
+
+    path : str
+
+      Path of a Plover dictionary.
+
+    into : dict, optional
+
+      Dict to merge the entries into, in place.  Entries already in
+      it are overridden.  Default is a new dict.
+
+    Returns
+    -------
+
+    The dict the entries were merged into.
+
+    """
+
+    if into is None:
+        into = {}
+
+    start = time.perf_counter()
+    # update in place; rebuilding the accumulated dict for each file
+    # is quadratic
+    for entries in dictionary_parsers.iter_dictionary(path):
+        into.update(entries)
+    elapsed = time.perf_counter() - start
+
+    if resource:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        log.debug(f"Loaded {path} in {elapsed:.3f}s (peak memory {peak} KiB)")
+    else:
+        log.debug(f"Loaded {path} in {elapsed:.3f}s")
+
+    return into
+
+
+##############
+# Cost model #
+##############
+
+# A cost model maps a stroke to a sort key; the stroke with the
+# lowest key is preferred.  Strokes of equal cost are ordered by the
+# stroke itself, so that the ranking is the same however the
+# dictionary was loaded or patched.  The compiled dictionary cache records the model it was
+# ranked with using the 'cache_id' attribute, or the function's
+# qualified name.  Other models, such as lambdas, closures, partials
+# and instances without 'cache_id', can't be told apart by name, so
+# the cache isn't used with them.
+
+def length_cost(stroke):
+    """Prefer the shortest stroke string."""
+    return len(stroke)
+
+
+def stroke_count_cost(stroke):
+    """Prefer the fewest strokes, then the shortest string."""
+    return (stroke.count('/') + 1, len(stroke))
+
+
+def key_count_cost(stroke):
+    """Prefer the fewest strokes, then the fewest keys pressed."""
+    return (stroke.count('/') + 1, len(stroke) - stroke.count('/') - stroke.count('-'))
+
+
+class PreferenceCost:
+    """Prefer strokes from a list, in list order.
+
+    Strokes not in the list rank after those that are, ordered by
+    the fallback cost model.
+
+    Parameters
+    ----------
+
+    preferred : iterable
+
+      Strokes in order of preference (e.g. ['WEPBT']).
+
+    fallback : callable, optional
+
+      Cost model for other strokes.  Default is stroke_count_cost.
+
+    """
+
+    def __init__(self, preferred, fallback=stroke_count_cost):
+        self.preferred = {s: i for i, s in reversed(list(enumerate(preferred)))}
+        self.fallback = fallback
+
+        h = hashlib.sha1('\0'.join(self.preferred).encode('utf-8')).hexdigest()
+        fallback_id = _cost_id(fallback)
+        self.cache_id = f"prefer:{h}:{fallback_id}" if fallback_id else None
+
+    def __call__(self, stroke):
+        rank = self.preferred.get(stroke)
+        if rank is not None:
+            return (0, rank)
+        return (1, self.fallback(stroke))
+
+
+def _cost_id(cost):
+    # None when the cost model can't be identified
+    cache_id = getattr(cost, 'cache_id', None)
+    if cache_id:
+        return cache_id
+    if isinstance(cost, (types.FunctionType, types.BuiltinFunctionType)):
+        # '<lambda>' and '<locals>' names are shared by different models
+        if '<' not in cost.__qualname__:
+            return f"{cost.__module__}.{cost.__qualname__}"
+    return None
+
+
+#################
+# Plover syntax #
+#################
+
+# text-producing punctuation written as a whole {} group
+PLOVER_PUNCTUATION = {',', '.', '?', '!', ':', ';'}
+
+# prefixes and suffixes of a {} group which only affect spacing or
+# case, longest first
+PLOVER_OPERATORS = ('~|', '-|', '^', '&', '>', '<')
+
+PLOVER_GROUP = re.compile(r'\{([^{}]*)\}')
+
+
+def normalize_plover(translation):
+    """Text produced by a translation written in Plover syntax.
+
+    Formatting operators such as attach ('^'), carry capitalization
+    ('~|') and glue ('&') are removed, leaving the literal text.
+    Groups without text (e.g. '{-|}', '{#Return}', '{PLOVER:...}') are
+    dropped.  For example, '{~|"^}' gives '"' and '{^}'s' gives "'s".
+
+    Parameters
+    ----------
+
+    translation : str
+
+      A Plover dictionary translation.
+
+    Returns
+    -------
+
+    Lowercased, stripped text, possibly empty.
+
+    """
+
+    def group_text(match):
+        inner = match.group(1)
+        if inner in PLOVER_PUNCTUATION:
+            return inner
+
+        # commands, key combinations and retro/meta operators
+        if not inner or inner[0] in '#*=:' or inner.upper().startswith(('PLOVER:', 'MODE:')):
+            return ''
+
+        stripped = True
+        while stripped and inner:
+            stripped = False
+            for op in PLOVER_OPERATORS:
+                if inner.startswith(op):
+                    inner = inner[len(op):]
+                    stripped = True
+                if inner.endswith(op):
+                    inner = inner[:-len(op)]
+                    stripped = True
+        return inner
+
+    return PLOVER_GROUP.sub(group_text, translation).strip().lower()
+
+
+class TranslationError(LookupError):
+    """Units have no strokes in the dictionary.
+
+    Parameters
+    ----------
+
+    units : list
+
+      The untranslatable units, in order of first appearance.
+
+    """
+
+    def __init__(self, units):
+        self.units = units
+        super().__init__(f"No strokes found for: {', '.join(repr(u) for u in units)}")
+
+
+class DictionaryChanges(dict):
+    """Changes to a dictionary, as computed by diff_sources.
+
+    Maps stroke to new translation, or to None for a removed stroke.
+    When the dictionary was compiled, thawed holds the dict of its
+    entries with the changes made and that dict's indexes, and base
+    the compiled dictionary they were made from.
+
+    """
+
+    base = None
+    thawed = None
 
 
 class TranslationDict:
@@ -19,6 +257,35 @@ class TranslationDict:
 
       Iterable of paths to Plover dictionaries.
 
+    use_cache : bool, optional
+
+      When True, read the dictionaries from the compiled cache if it
+      is up to date and otherwise write the cache after parsing them.
+      Default is True.
+
+    processes : int, optional
+
+      Number of processes used to parse the dictionaries.  See load.
+
+    progress : callable, optional
+
+      Called as progress(done, total) after each dictionary is
+      parsed.  See load.
+
+    cost : callable, optional
+
+      Cost model used to rank the strokes of each translation, such
+      as stroke_count_cost or a PreferenceCost.  Default is
+      length_cost.  The cache is only used with a named function or
+      a model with a 'cache_id' attribute.
+
+    compact : bool, optional
+
+      When True, pack the parsed dictionaries into the compact,
+      read-only form used by the cache instead of keeping Python
+      dicts.  A dictionary read from the cache is always compact.
+      Default is False.
+
     """
 
     #############
@@ -33,9 +300,109 @@ class TranslationDict:
     #
     # [1] https://web.archive.org/web/20220313103021/https://treyhunner.com/2019/04/why-you-shouldnt-inherit-from-list-and-dict-in-python/
 
-    def __init__(self, plover_dicts=None):
+    #
+    # 'self._data' is either a dict or, when loaded from the cache or
+    # compacted, a read-only CompiledDictionary backed by a buffer.
+    # The compiled form is copied into a dict on the first change.
+
+    def __init__(self, plover_dicts=None, use_cache=True, processes=None, progress=None,
+                 cost=length_cost, compact=False):
+        plover_dicts = list(plover_dicts or [])
+        self._paths = plover_dicts
+        self._cost = cost
+
+        # contents of each dictionary file, read on the first reload;
+        # see diff_sources
+        self._sources = None
+
+        # word-level trie of multi-unit translations; see segment
+        self._phrases = None
+
+        # encoded strokes of every entry; see encode
+        self._encoded = None
+
+        cost_id = _cost_id(cost)
+        if use_cache and cost_id is None:
+            log.debug(f"Not using dictionary cache: cost model {cost!r} has no cache_id")
+            use_cache = False
+
+        compiled = None
+        if use_cache and plover_dicts:
+            compiled = dictionary_cache.open_cache(plover_dicts, cost_id)
+
+        if compiled is not None:
+            log.debug(f"Loaded dictionary cache for {plover_dicts}")
+            self._data = compiled
+            self._strokes = compiled.reverse
+            self._formatted = self._index_formatted(compiled.reverse, compiled.reverse.containing('{'))
+            return
+
         self._data = {}
-        self._data = self.load(plover_dicts)
+        self._data = self.load(plover_dicts, processes=processes, progress=progress)
+        self._index()
+
+        packed = None
+        if use_cache and self._data:
+            try:
+                packed = dictionary_cache.write_cache(plover_dicts, self._data, self._strokes, cost_id)
+            except OSError as err:
+                log.warning(f"Could not write dictionary cache: {err}")
+
+        if compact and self._data:
+            # the cache's bytes are reused rather than compiled again
+            try:
+                if packed is None:
+                    packed = dictionary_cache.compile_dictionary(self._data, self._strokes)
+            except ValueError as err:
+                log.debug(f"Keeping dictionary as dict: {err}")
+            else:
+                # the small Plover syntax index is kept as is
+                self._data = dictionary_cache.CompiledDictionary(packed)
+                self._strokes = self._data.reverse
+
+    def _index(self):
+        # Reverse index mapping each translation to the strokes
+        # which produce it, best first by the cost model.  Built once
+        # here and kept current by __setitem__ and pop so that lookups
+        # neither scan the values nor sort.
+        self._strokes, self._formatted = self._build_indexes(self._data)
+
+    def _build_indexes(self, data):
+        # The indexes of data, leaving self unchanged.  Only string
+        # translations are indexed; other json values (e.g. lists)
+        # are kept as entries but can't be looked up by text.
+        reverse = {}
+        for stroke, translation in data.items():
+            if isinstance(translation, str):
+                reverse.setdefault(translation, []).append(stroke)
+        for strokes in reverse.values():
+            if len(strokes) > 1:
+                strokes.sort(key=self._rank)
+
+        return reverse, self._index_formatted(reverse, (t for t in reverse if '{' in t))
+
+    def _index_formatted(self, reverse, translations):
+        # Secondary index of translations which use Plover syntax
+        # (e.g. '{,}' or '{~|"^}'), keyed by the text they produce.
+        formatted = {}
+        for translation in sorted(translations):
+            text = normalize_plover(translation)
+            if text:
+                formatted.setdefault(text, []).extend(reverse[translation])
+        for strokes in formatted.values():
+            if len(strokes) > 1:
+                strokes.sort(key=self._rank)
+        return formatted
+
+    def _rank(self, stroke):
+        # sort key of a stroke among those of a translation
+        return (self._cost(stroke), stroke)
+
+    def _thaw(self):
+        # copy a compiled dictionary into a dict before changing it
+        if not isinstance(self._data, dict):
+            self._data = dict(self._data.items())
+            self._index()
 
     def __repr__(self):
         return self._data.__repr__()
@@ -49,10 +416,42 @@ class TranslationDict:
     # "(python) Emulating container types".
 
     def pop(self, key, default=None):
+        self._thaw()
+        self._phrases = None
+        self._encoded = None
+        if key in self._data:
+            self._unindex(key, self._data[key])
         return self._data.pop(key, default)
 
     def __setitem__(self, key, value):
+        self._thaw()
+        self._phrases = None
+        self._encoded = None
+        if key in self._data:
+            self._unindex(key, self._data[key])
         self._data[key] = value
+        for index, text in self._index_keys(value):
+            strokes = index.setdefault(text, [])
+            strokes.append(key)
+            strokes.sort(key=self._rank)
+
+    def _index_keys(self, translation):
+        # the (index, key) pairs under which a translation is indexed
+        if not isinstance(translation, str):
+            return []
+        keys = [(self._strokes, translation)]
+        if '{' in translation:
+            text = normalize_plover(translation)
+            if text:
+                keys.append((self._formatted, text))
+        return keys
+
+    def _unindex(self, stroke, translation):
+        for index, text in self._index_keys(translation):
+            strokes = index[text]
+            strokes.remove(stroke)
+            if not strokes:
+                del index[text]
 
     def __getitem__(self, key):
         return self._data[key]
@@ -95,9 +494,18 @@ class TranslationDict:
 
     # WARNING: DO NOT USE 'self._data' BEYOND THIS POINT! USE 'self'.
 
+    @property
+    def sources(self):
+        """Paths of the loaded Plover dictionaries, in load order."""
+        return list(self._paths)
+
     @classmethod
-    def load(self, to_load=None):
-        """Import Plover json format dictionaries.
+    def load(self, to_load=None, processes=None, progress=None):
+        """Import Plover dictionaries.
+
+        Each file is parsed incrementally and merged in place.  Later
+        dictionaries take precedence over earlier ones.  Time and
+        peak memory for each file are logged at the debug level.
 
         Parameters
         ----------
@@ -105,7 +513,19 @@ class TranslationDict:
         to_load : iterable, optional
 
           Iterable (e.g. list or tuple) of Plover dictionary file
-          paths in json format.
+          paths in json or RTF/CRE format, optionally compressed.
+
+        processes : int, optional
+
+          When greater than 1 and several files are given, parse the
+          files in a pool of this many processes.  The results are
+          still merged in the given order.  Default is None, parse
+          in this process.
+
+        progress : callable, optional
+
+          Called as progress(done, total) after each file is parsed.
+          An exception raised by it aborts the load.
 
         Returns
         -------
@@ -114,23 +534,132 @@ class TranslationDict:
 
         """
 
-        # TODO handle different dictionary types
-
-        if not to_load:
-            to_load = []
+        to_load = list(to_load or [])
 
         temp = {}
-        for path in to_load:
-            with open(path, 'r') as f:
-                contents = f.read()
-                loaded = json.loads(contents)
-
-            temp = {**temp, **loaded}
+        if processes and processes > 1 and len(to_load) > 1:
+            workers = min(processes, len(to_load))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # map yields in submission order, so precedence holds
+                for i, loaded in enumerate(executor.map(read_dictionary, to_load)):
+                    temp.update(loaded)
+                    if progress:
+                        progress(i + 1, len(to_load))
+        else:
+            for i, path in enumerate(to_load):
+                read_dictionary(path, temp)
+                if progress:
+                    progress(i + 1, len(to_load))
 
         return temp
 
-    def _get_stroke_indices(self, unit):
-        """Find indices of all strokes matching a unit.
+    def diff_sources(self, changed):
+        """Re-read changed dictionary files and compute their effect.
+
+        Only the changed files are parsed, except on the first call
+        when the other files are read once to learn which entries
+        each file provides.  The dictionary itself is not modified,
+        so this may run on a worker thread while lookups continue.
+        Pass the result to apply_changes.
+
+        Parameters
+        ----------
+
+        changed : iterable
+
+          Paths, as given when loading, of the dictionaries which
+          changed on disk.  Other paths are ignored.
+
+        Returns
+        -------
+
+        DictionaryChanges mapping each stroke whose translation
+        changed to its new translation, or to None when the stroke
+        was removed.
+
+        """
+
+        changed = [path for path in changed if path in self._paths]
+        new = {path: read_dictionary(path) for path in changed}
+
+        # A compiled dictionary is copied into a dict here, where
+        # lookups are cheap; with the changes made, it and its
+        # indexes replace the compiled one in apply_changes so that
+        # the GUI thread only swaps them in.
+        current = self._data if isinstance(self._data, dict) else dict(self._data.items())
+
+        if self._sources is None:
+            sources = {path: new[path] if path in new else read_dictionary(path)
+                       for path in self._paths}
+            # which strokes the changed files used to provide is
+            # unknown, so check them all
+            affected = set(current)
+            for contents in new.values():
+                affected.update(contents)
+        else:
+            sources = dict(self._sources)
+            affected = set()
+            for path, contents in new.items():
+                affected.update(sources[path])
+                affected.update(contents)
+                sources[path] = contents
+
+        self._sources = sources
+
+        # later dictionaries take precedence
+        ordered = [sources[path] for path in reversed(self._paths)]
+        changes = {}
+        for stroke in affected:
+            translation = next((d[stroke] for d in ordered if stroke in d), None)
+            if current.get(stroke) != translation:
+                changes[stroke] = translation
+
+        changes = DictionaryChanges(changes)
+
+        if changes and current is not self._data:
+            for stroke, translation in changes.items():
+                if translation is None:
+                    current.pop(stroke, None)
+                else:
+                    current[stroke] = translation
+            changes.base = self._data
+            changes.thawed = (current,) + self._build_indexes(current)
+
+        log.debug(f"{len(changes)} entries changed in {changed}")
+        return changes
+
+    def apply_changes(self, changes):
+        """Patch the dictionary and its indexes with computed changes.
+
+        Every change is applied before returning, so callers on the
+        same thread never see a partial update.  A compiled
+        dictionary is replaced by the copy diff_sources made of it.
+
+        Parameters
+        ----------
+
+        changes : dict
+
+          Mapping of stroke to new translation, or to None to remove
+          the stroke, as returned by diff_sources.
+
+        """
+
+        thawed = getattr(changes, 'thawed', None)
+        if thawed is not None and changes.base is self._data:
+            data, reverse, formatted = thawed
+            self._data, self._strokes, self._formatted, self._phrases, self._encoded = (
+                data, reverse, formatted, None, None)
+            return
+
+        for stroke, translation in changes.items():
+            if translation is None:
+                self.pop(stroke)
+            else:
+                self[stroke] = translation
+
+    def _lookup_strokes(self, unit):
+        """Find all strokes matching a unit.
 
         Parameters
         ----------
@@ -142,17 +671,20 @@ class TranslationDict:
         Returns
         -------
 
-        List of indices corresponding to strokes in the Plover
-        dictionary.
+        List of strokes in the Plover dictionary, best first.
 
         """
 
-        # TODO fails to find some words and punctuation.  This may be
-        # because of the direct comparison.  A unit may map to
-        # something like '{~|"^}' (i.e. double quote, KW-GS).
+        # get_strokes fails on IndexError when getting first element
+        # when no dictionary loaded.
+        if not self:
+            raise ValueError("No dictionary loaded.")
 
-        return [i for i, entry in enumerate(list(self.values()))
-                if entry == unit.lower().strip()]
+        # A unit may map to something like '{~|"^}' (i.e. double
+        # quote, KW-GS).  Those are found in the normalized index.
+        key = unit.lower().strip()
+        strokes = self._strokes.get(key) or self._formatted.get(key, [])
+        return list(strokes)
 
     def get_strokes(self, unit, sorted=True):
         """Find strokes in the dictionary corresponding to the unit.
@@ -167,8 +699,9 @@ class TranslationDict:
 
         sorted : bool, optional
 
-          When True, return the list of strokes ordered from shortest
-          to longest.  Default is True.
+          Kept for compatibility.  Strokes are ranked by the cost
+          model when the dictionary is loaded, so they are always
+          returned best first.  Default is True.
 
         Returns
         -------
@@ -177,12 +710,43 @@ class TranslationDict:
 
         """
 
-        # TODO performance?
-        indices = self._get_stroke_indices(unit)
-        strokes = [list(self.keys())[i] for i in indices]
-        if sorted:
-            strokes.sort(key=len)
-        return strokes
+        return self._lookup_strokes(unit)
+
+    def get_chords(self, unit):
+        """Find strokes for the unit, encoded by stroke_codec.
+
+        Returns
+        -------
+
+        List of tuples of integer masks, one tuple per outline, best
+        first.  Outlines which aren't valid steno are skipped.
+
+        """
+
+        chords = []
+        for outline in self.get_strokes(unit):
+            try:
+                chords.append(stroke_codec.encode_outline(outline))
+            except ValueError:
+                pass
+        return chords
+
+    def encode(self):
+        """Encode the strokes of every entry, in dictionary order.
+
+        Computed once and kept until the dictionary changes.  See
+        stroke_codec.encode_outlines.
+
+        Returns
+        -------
+
+        Tuple of arrays (masks, offsets).
+
+        """
+
+        if self._encoded is None:
+            self._encoded = stroke_codec.encode_outlines(self)
+        return self._encoded
 
     @classmethod
     def split_into_strokable_units(self, text):
@@ -207,36 +771,65 @@ class TranslationDict:
 
         """
 
-        # Symbols need to be strokable units except that single quote
-        # shouldn't be a stroke unit if it appears inside a unit.  The
-        # following works. TODO Is there a better way to express this?
-
-        # split into words
-        _split_with_single_quotes = re.findall(UNIT_REGEX, text)
-
-        # split apostrophes at the beginning and end of a unit
-        text_split = []
-        for stroke_unit in _split_with_single_quotes:
-            if stroke_unit[0] == "\'" or stroke_unit[-1] == "\'":
-                for u in stroke_unit.split("\'"):
-                    if u:
-                        text_split.append(u)
-                    else:
-                        # split removes separator and returns empty
-                        # string
-                        text_split.append("'")
-            else:
-                text_split.append(stroke_unit)
+        return UNIT_PATTERN.findall(text)
+
+    @classmethod
+    def iter_strokable_units(self, text):
+        """Yield the strokable units of a text one at a time.
+
+        Gives the same units as split_into_strokable_units without
+        building the whole list, for large texts.
+
+        Parameters
+        ----------
+        text : str, file or iterable of str
+
+          Text to be split.  A file or other iterable is read in
+          pieces; a unit may span pieces.
+
+        Yields
+        ------
 
-        return text_split
+          Strokable units (e.g. words and symbols)
 
-    def translate(self, text):
+        """
+
+        # Units never contain whitespace, so text can be split in
+        # pieces which end at whitespace.
+        if isinstance(text, str):
+            pos = 0
+            while pos < len(text):
+                end = pos + UNIT_CHUNK_SIZE
+                cut = _whitespace_before(text, pos, end) if end < len(text) else len(text)
+                if cut == pos:
+                    # no whitespace in the piece; take up to the next
+                    match = WHITESPACE.search(text, end)
+                    cut = match.end() if match else len(text)
+                yield from UNIT_PATTERN.findall(text, pos, cut)
+                pos = cut
+            return
+
+        if hasattr(text, 'read'):
+            text = iter(partial(text.read, UNIT_CHUNK_SIZE), '')
+
+        # whatever follows the last whitespace of a piece waits for
+        # the next piece
+        rest = ''
+        for chunk in text:
+            buffer = rest + chunk
+            cut = _whitespace_before(buffer, 0, len(buffer))
+            yield from UNIT_PATTERN.findall(buffer, 0, cut)
+            rest = buffer[cut:]
+
+        yield from UNIT_PATTERN.findall(rest)
+
+    def translate(self, text, briefs=False):
         """Translate to steno strokes.
 
         Units are defined by the UNIT_REGEX and are translated
         one-to-one.  Each unit corresponds to a stroke.  For example,
         the unit "as well as" returns three strokes even if a brief
-        exists to do it in one stroke.
+        exists to do it in one stroke, unless briefs is True.
 
         Parameters
         ----------
@@ -245,18 +838,174 @@ class TranslationDict:
 
           Corpus to be translated.
 
+        briefs : bool, optional
+
+          When True, translate multi-unit phrases with a single
+          outline where that takes fewer strokes.  See segment.
+          Default is False.
+
         Returns
         -------
 
-        List of strokes corresponding to each unit in the text.
+        List of strokes corresponding to each unit (or phrase) in
+        the text.
+
+        Raises
+        ------
+
+        TranslationError when a unit has no strokes.
 
         """
 
-        # TODO There may be optimizations here. Aside from the lookup
-        # being slow, there's the issue of getting the correct
-        # translation.  For example, "went" will be translated as
-        # 'WEBLT' instead of 'WEPBT' since the strings have the same
-        # length and B < P.
-        split = self.split_into_strokable_units(text)
-        translation = [self.get_strokes(u)[0] for u in split]
+        if briefs:
+            segments = self.segment(text)
+            translation = [stroke for _, stroke in segments]
+            untranslatable = list(dict.fromkeys(
+                units[0] for units, stroke in segments if stroke is None))
+        else:
+            translation, untranslatable = self.translate_batch(text)
+
+        if untranslatable:
+            raise TranslationError(untranslatable)
         return translation
+
+    def translate_batch(self, corpus):
+        """Translate a corpus, looking up each distinct unit once.
+
+        Parameters
+        ----------
+
+        corpus : str or iterable
+
+          Text to be split into units, or a sequence of units
+          (e.g. from split_into_strokable_units).
+
+        Returns
+        -------
+
+        Tuple of the list of strokes for each unit, with None for
+        units that have no strokes, and the list of untranslatable
+        units in order of first appearance.
+
+        """
+
+        # The preferred stroke depends on the cost model.  For
+        # example, by length alone "went" may be translated as 'WEBLT'
+        # instead of 'WEPBT'; a PreferenceCost can settle such ties.
+        if isinstance(corpus, str):
+            units = self.split_into_strokable_units(corpus)
+        else:
+            units = list(corpus)
+
+        # dict preserves order of first appearance
+        best = dict.fromkeys(units)
+        for unit in best:
+            strokes = self.get_strokes(unit)
+            if strokes:
+                best[unit] = strokes[0]
+
+        translation = [best[u] for u in units]
+        untranslatable = [u for u, stroke in best.items() if stroke is None]
+        return translation, untranslatable
+
+    def _build_phrase_trie(self):
+        """Build a word-level trie of the multi-unit translations.
+
+        Each node maps a lowercased unit to the next node.  A node
+        which completes a translation holds (stroke, stroke count)
+        for its best stroke under the key None.
+
+        """
+
+        trie = {}
+        for translation in self._strokes:
+            # quick reject before splitting; formatting isn't a phrase
+            if ' ' not in translation or '{' in translation:
+                continue
+            units = self.split_into_strokable_units(translation)
+            if len(units) < 2:
+                continue
+
+            node = trie
+            for unit in units:
+                node = node.setdefault(unit.lower(), {})
+
+            stroke = self._strokes[translation][0]
+            node[None] = (stroke, stroke.count('/') + 1)
+
+        return trie
+
+    def segment(self, corpus):
+        """Split a corpus into the fewest strokes, using briefs.
+
+        Multi-unit translations (e.g. "as well as") are matched
+        against the units of the corpus with a word-level trie and a
+        dynamic program picks the segmentation with the fewest
+        strokes.  Ties go to the longer phrase.  The cost is linear
+        in the number of units.
+
+        Parameters
+        ----------
+
+        corpus : str or iterable
+
+          Text to be split into units, or a sequence of units.
+
+        Returns
+        -------
+
+        List of (units, stroke) tuples, where units is the tuple of
+        units written by stroke.  The stroke is None for a unit with
+        no strokes.
+
+        """
+
+        if isinstance(corpus, str):
+            units = self.split_into_strokable_units(corpus)
+        else:
+            units = list(corpus)
+
+        if self._phrases is None:
+            self._phrases = self._build_phrase_trie()
+
+        # stroke and stroke count of each distinct unit
+        singles = {}
+        for unit in units:
+            if unit not in singles:
+                strokes = self.get_strokes(unit)
+                stroke = strokes[0] if strokes else None
+                singles[unit] = (stroke, stroke.count('/') + 1 if stroke else 1)
+
+        keys = [u.lower().strip() for u in units]
+        n = len(units)
+
+        # cost[i] is the fewest strokes for units[i:]; choice[i] is
+        # (end, stroke) of the first segment achieving it
+        cost   = [0] * (n + 1)
+        choice = [None] * n
+        for i in range(n - 1, -1, -1):
+            stroke, count = singles[units[i]]
+            best_cost = count + cost[i+1]
+            best = (i + 1, stroke)
+
+            node = self._phrases.get(keys[i])
+            j = i + 1
+            while node and j < n:
+                node = node.get(keys[j])
+                j += 1
+                if node and None in node:
+                    stroke, count = node[None]
+                    if count + cost[j] <= best_cost:
+                        best_cost = count + cost[j]
+                        best = (j, stroke)
+
+            cost[i] = best_cost
+            choice[i] = best
+
+        segments = []
+        i = 0
+        while i < n:
+            end, stroke = choice[i]
+            segments.append((tuple(units[i:end]), stroke))
+            i = end
+        return segments
@@ -143,6 +143,9 @@ class TextLabel(QtWidgets.QTextEdit):
 
     """
 
+    # emitted after the text is drawn
+    painted = QtCore.Signal()
+
     def __init__(self, text='', parent=None):
         super().__init__()
 
@@ -168,3 +171,7 @@ class TextLabel(QtWidgets.QTextEdit):
         font_metrics = QtGui.QFontMetrics(self.font())
         height = font_metrics.height() + (self.frameWidth()) * 2
         self.setFixedHeight(height)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        self.painted.emit()
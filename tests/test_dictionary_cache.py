@@ -0,0 +1,127 @@
+import os
+import json
+
+import pytest
+
+from t_rex_typer import dictionary_cache
+from t_rex_typer.dictionary_cache import CompiledDictionary, compile_dictionary
+from t_rex_typer.translation_dict import TranslationDict, length_cost, _cost_id
+
+
+ENTRIES = {
+    "KAT": "cat",
+    "KAT/-S": "cats",
+    "KA*T": "cat",
+    "KAF": "café",
+    "TKPWRAEUT": "größe",
+    "TKPWROE/SA": "größe",
+    "RAPT/ER": "\U0001F996",
+    "T-RBGS": "t-rex \U0001F996",
+    "STKPWHRé": "é",
+    "\U0001F996/\U0001F996": "dino",
+    "KW-BG": "{,}",
+    "TP-PL": "{.}",
+    "KW-GS": "{^,}",
+    "TH": "the",
+    "-T": "{-|}the",
+    "PW-FP": "{^}s",
+}
+
+
+@pytest.fixture
+def cache_directory(tmp_path, monkeypatch):
+    directory = str(tmp_path / "cache")
+    monkeypatch.setattr(dictionary_cache, 'CACHE_DIRECTORY', directory)
+    return directory
+
+
+@pytest.fixture
+def paths(tmp_path):
+    path = str(tmp_path / "main.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(ENTRIES, f, ensure_ascii=False)
+    return [path]
+
+
+def indexes(dictionary):
+    return ({t: list(s) for t, s in dictionary._strokes.items()},
+            {t: list(s) for t, s in dictionary._formatted.items()})
+
+
+def test_compiled_lookups_match_dict(paths):
+    dictionary = TranslationDict(paths, use_cache=False)
+    compiled = CompiledDictionary(compile_dictionary(dictionary._data, dictionary._strokes))
+
+    assert list(compiled.items()) == list(dictionary._data.items())
+    for stroke, translation in ENTRIES.items():
+        assert compiled[stroke] == translation
+    for missing in ("", "KA", "KATS", "\U0001F995", "zzz"):
+        assert missing not in compiled
+
+    assert dict(compiled.reverse) == dictionary._strokes
+    assert "caf" not in compiled.reverse
+    assert sorted(compiled.reverse.containing('{')) == sorted(t for t in dictionary._strokes if '{' in t)
+
+
+def test_cache_path_matches_fresh_load(paths, cache_directory):
+    fresh = TranslationDict(paths, use_cache=False)
+    TranslationDict(paths)
+    cached = TranslationDict(paths)
+
+    assert isinstance(cached._data, CompiledDictionary)
+    assert dict(cached.items()) == dict(fresh.items())
+    assert indexes(cached) == indexes(fresh)
+    assert cached.get_strokes("größe") == fresh.get_strokes("größe")
+
+
+def damage_truncate(path, paths):
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 3)
+
+
+def damage_flip(path, paths):
+    with open(path, 'r+b') as f:
+        f.seek(-5, os.SEEK_END)
+        byte = f.read(1)
+        f.seek(-5, os.SEEK_END)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+def damage_stale(path, paths):
+    # same entries but a new modification time
+    st = os.stat(paths[0])
+    os.utime(paths[0], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+@pytest.mark.parametrize('damage', [damage_truncate, damage_flip, damage_stale])
+def test_unusable_cache_falls_back_to_json(paths, cache_directory, damage):
+    TranslationDict(paths)
+    path = dictionary_cache.cache_path(paths)
+    damage(path, paths)
+
+    assert dictionary_cache.open_cache(paths, _cost_id(length_cost)) is None
+    dictionary = TranslationDict(paths)
+    assert isinstance(dictionary._data, dict)
+    assert dict(dictionary.items()) == ENTRIES
+
+    # and the cache was written again
+    assert isinstance(TranslationDict(paths)._data, CompiledDictionary)
+
+
+def test_compact_reuses_cache_bytes(paths, cache_directory, monkeypatch):
+    compiled = []
+    compile_dictionary = dictionary_cache.compile_dictionary
+
+    def counting(*args, **kwargs):
+        compiled.append(compile_dictionary(*args, **kwargs))
+        return compiled[-1]
+
+    monkeypatch.setattr(dictionary_cache, 'compile_dictionary', counting)
+
+    dictionary = TranslationDict(paths, compact=True)
+
+    assert len(compiled) == 1
+    with open(dictionary_cache.cache_path(paths), 'rb') as f:
+        assert f.read() == compiled[0]
+    assert isinstance(dictionary._data, CompiledDictionary)
+    assert dict(dictionary.items()) == ENTRIES
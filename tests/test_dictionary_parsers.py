@@ -0,0 +1,158 @@
+import io
+import bz2
+import gzip
+import json
+import lzma
+
+import pytest
+
+from t_rex_typer.dictionary_parsers import (iter_json_chunks, iter_rtf_chunks, iter_dictionary,
+                                            rtf_to_plover)
+
+
+CHUNK_SIZES = [1, 3, 7, 1 << 20]
+
+ENTRIES = {
+    "KAT": "cat",
+    "KW-BG": "{,}",
+    "KWR-GS": "\"",
+    "PWHRA*RB": "\\",
+    "TPHRAOEUPB": "line\nbreak",
+    "KAF": "café",
+    "RAPT/ER": "\U0001F996",
+    "TKPWR-BG": "{,\n}",
+    "SKWR-FPB": "a\", \"b",
+}
+
+DOCUMENTS = {
+    'indented': json.dumps(ENTRIES, indent=0, ensure_ascii=False),
+    'minified': json.dumps(ENTRIES, separators=(',', ':'), ensure_ascii=False),
+    'ascii': json.dumps(ENTRIES, indent=2),
+    'crlf': json.dumps(ENTRIES, indent=0, ensure_ascii=False).replace('\n', '\r\n'),
+    'nested': '{\n"A": {"x": [1,\n2]},\n"B": "b",\n"C": [\n"c"\n],\n"D": 4\n}',
+    'multi-line members': '{"A"\n:\n"a"\n,\n"B":\n"b"}',
+    'empty': '{}',
+    'surrounding whitespace': '\n  {"A": "a"}  \n',
+}
+
+
+def parse_json(text, chunk_size):
+    parsed = {}
+    for members in iter_json_chunks(io.StringIO(text), chunk_size):
+        parsed.update(members)
+    return parsed
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('name', DOCUMENTS)
+def test_json_matches_json_loads(name, chunk_size):
+    text = DOCUMENTS[name]
+    parsed = parse_json(text, chunk_size)
+    assert parsed == json.loads(text)
+    assert list(parsed) == list(json.loads(text))
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_truncated_json_raises(chunk_size):
+    text = DOCUMENTS['indented']
+    for end in (0, 1, len(text) // 2, len(text) - 1):
+        with pytest.raises(json.JSONDecodeError):
+            parse_json(text[:end], chunk_size)
+
+
+RTF = (
+    "{\\rtf1\\ansi{\\*\\cxrev100}\\cxdict{\\*\\cxsystem Test}\r\n"
+    "{\\*\\cxs KAT}cat\r\n"
+    "{\\*\\cxs TP-PL}{\\cxp. }\r\n"
+    "{\\*\\cxs KW-BG}{\\cxp, }\r\n"
+    "{\\*\\cxs -S}\\cxds s\r\n"
+    "{\\*\\cxs KAF}caf\\'e9\r\n"
+    "{\\*\\cxs KAFR}caf\\u233?\r\n"
+    "{\\*\\cxs TK-PB}{\\*\\cxcomment a note}dinner\r\n"
+    "{\\*\\cxs KP-FP}\\cxfc\r\n"
+    "}\r\n"
+)
+
+RTF_ENTRIES = {
+    "KAT": "cat",
+    "TP-PL": "{.}",
+    "KW-BG": "{,}",
+    "-S": "{^}s",
+    "KAF": "café",
+    "KAFR": "café",
+    "TK-PB": "dinner",
+    "KP-FP": "{-|}",
+}
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_rtf(chunk_size):
+    parsed = {}
+    for entries in iter_rtf_chunks(io.StringIO(RTF), chunk_size):
+        parsed.update(entries)
+    assert parsed == RTF_ENTRIES
+
+
+@pytest.mark.parametrize('rtf, plover', [
+    ("\\cxds ing", "{^}ing"),
+    ("{\\cxp. }", "{.}"),
+    ("caf\\'e9", "café"),
+    ("caf\\u233?", "café"),
+    ("{\\*\\cxcomment note}text", "text"),
+    ("a\\~b", "a b"),
+    ("plain", "plain"),
+])
+def test_rtf_to_plover(rtf, plover):
+    assert rtf_to_plover(rtf) == plover
+
+
+def write(path, opener, text, encoding='utf-8'):
+    with opener(path, 'wb') as f:
+        f.write(text.encode(encoding))
+    return str(path)
+
+
+@pytest.mark.parametrize('name, opener', [
+    ('main.json', open),
+    ('main.json.gz', gzip.open),
+    ('main.json.bz2', bz2.open),
+    ('main.json.xz', lzma.open),
+    ('gzipped.json', gzip.open),   # compressed despite the extension
+    ('main.txt', open),            # format sniffed from the contents
+])
+@pytest.mark.parametrize('chunk_size', [7, 1 << 20])
+def test_dictionary_files(tmp_path, name, opener, chunk_size):
+    path = write(tmp_path / name, opener, DOCUMENTS['indented'])
+    parsed = {}
+    for members in iter_dictionary(path, chunk_size):
+        parsed.update(members)
+    assert parsed == ENTRIES
+
+
+def test_json_with_bom(tmp_path):
+    path = write(tmp_path / "bom.json", open, '\ufeff' + DOCUMENTS['indented'])
+    parsed = {}
+    for members in iter_dictionary(path, 3):
+        parsed.update(members)
+    assert parsed == ENTRIES
+
+
+@pytest.mark.parametrize('name', ['main.rtf', 'main.rtf.gz', 'sniffed.dic'])
+def test_rtf_files(tmp_path, name):
+    opener = gzip.open if name.endswith('.gz') else open
+    path = write(tmp_path / name, opener, RTF, 'cp1252')
+    parsed = {}
+    for entries in iter_dictionary(path, 7):
+        parsed.update(entries)
+    assert parsed == RTF_ENTRIES
+
+
+def test_minified_json_is_yielded_in_pieces():
+    entries = {f"S{i}": "a\", \"b" if i % 3 else f"w{i}" for i in range(1000)}
+    text = json.dumps(entries, separators=(',', ':'))
+
+    pieces = [members for members in iter_json_chunks(io.StringIO(text), 256) if members]
+
+    assert len(pieces) > 50
+    assert max(map(len, pieces)) < 50
+    assert {k: v for members in pieces for k, v in members.items()} == entries
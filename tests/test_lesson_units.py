@@ -0,0 +1,68 @@
+import random
+
+from t_rex_typer.lesson_units import LessonUnits, utf16_length
+from t_rex_typer.translation_dict import UNIT_PATTERN
+
+
+WORDS = ["the", "cat", "sat", "on", "mat", "don't", "\"hi\"", "(a)", "café",
+         "\U0001F996", "r\U0001F996x", "中文", "well...", "x-ray"]
+
+
+def split(text):
+    """Units and their UTF-16 positions, from scratch."""
+    return ([m.group() for m in UNIT_PATTERN.finditer(text)],
+            [utf16_length(text[:m.start()]) for m in UNIT_PATTERN.finditer(text)])
+
+
+def check(units, text):
+    expected_units, expected_starts = split(text)
+    assert list(units) == expected_units
+    assert [units.start(i) for i in range(len(units))] == expected_starts
+
+
+def edit(units, text, rng):
+    """Replace a random part of text as MainWindow does and return the new text."""
+    position = rng.randrange(len(text) + 1)
+    removed = rng.randrange(min(8, len(text) - position) + 1)
+    added = ' '.join(rng.choice(WORDS) for _ in range(rng.randrange(4)))
+    if rng.random() < 0.5:
+        added = ' ' + added
+    new_text = text[:position] + added + text[position + removed:]
+
+    # widen to whitespace in the new text
+    start = position
+    while start > 0 and not new_text[start - 1].isspace():
+        start -= 1
+    end = position + len(added)
+    while end < len(new_text) and not new_text[end].isspace():
+        end += 1
+    old_end = end - len(added) + removed
+
+    units.replace(utf16_length(text[:start]), utf16_length(text[:old_end]), new_text[start:end])
+    return new_text
+
+
+def test_initial_split():
+    text = "the \U0001F996 sat, on \"the\" mat's edge."
+    check(LessonUnits(text), text)
+
+
+def test_random_edits_match_a_full_split():
+    rng = random.Random(0)
+    for _ in range(50):
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randrange(30)))
+        units = LessonUnits(text)
+        for _ in range(40):
+            text = edit(units, text, rng)
+            check(units, text)
+
+
+def test_edits_before_the_end_only_touch_nearby_units():
+    units = LessonUnits(' '.join(["word"] * 1000))
+    units.replace(5, 5, "new ")
+
+    # an edit further back takes the pending shift with it, so the
+    # next edit near it doesn't visit the rest of the lesson
+    units.replace(0, 0, "a ")
+    assert units._shift_index == 1
+    assert units.start(len(units) - 1) == 2 + 5 * 999 + 4
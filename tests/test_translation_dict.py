@@ -0,0 +1,71 @@
+import json
+import random
+
+import pytest
+
+from t_rex_typer.translation_dict import TranslationDict
+
+
+STROKES = ["WEBLT", "WEPBT", "TH", "-T", "SKWR", "KAT", "KAT/-S", "TPH", "PH-FP", "TKOG"]
+TRANSLATIONS = ["went", "wept", "the", "cat", "cats", "{,}", "{^,}", "dog", "{-|}the"]
+
+
+def write(path, entries):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f)
+
+
+def indexes(dictionary):
+    return ({t: list(s) for t, s in dictionary._strokes.items()},
+            {t: list(s) for t, s in dictionary._formatted.items()})
+
+
+def test_ties_rank_by_stroke(tmp_path):
+    path = str(tmp_path / "a.json")
+    write(path, {"WEBLT": "wept", "WEPBT": "went"})
+    dictionary = TranslationDict([path], use_cache=False)
+
+    write(path, {"WEBLT": "went", "WEPBT": "went"})
+    dictionary.apply_changes(dictionary.diff_sources([path]))
+
+    assert dictionary.get_strokes('went') == ['WEBLT', 'WEPBT']
+    assert dictionary.get_strokes('went') == TranslationDict([path], use_cache=False).get_strokes('went')
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_reload_matches_a_fresh_load(tmp_path, compact):
+    rng = random.Random(0)
+    paths = [str(tmp_path / f"{i}.json") for i in range(3)]
+
+    def rewrite(path):
+        write(path, {s: rng.choice(TRANSLATIONS) for s in rng.sample(STROKES, rng.randrange(len(STROKES)))})
+
+    for path in paths:
+        rewrite(path)
+    dictionary = TranslationDict(paths, use_cache=False, compact=compact)
+
+    for _ in range(30):
+        changed = rng.sample(paths, rng.randrange(1, 3))
+        for path in changed:
+            rewrite(path)
+        dictionary.apply_changes(dictionary.diff_sources(changed))
+
+        fresh = TranslationDict(paths, use_cache=False)
+        assert dict(dictionary.items()) == dict(fresh.items())
+        assert indexes(dictionary) == indexes(fresh)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_non_string_values_are_kept_but_not_indexed(tmp_path, compact):
+    path = str(tmp_path / "a.json")
+    write(path, {"KAT": "cat", "HRAOEUS": ["a", "b"], "TPHUPL": 5, "TPHOPB": None})
+    dictionary = TranslationDict([path], use_cache=False, compact=compact)
+
+    assert dictionary["HRAOEUS"] == ["a", "b"]
+    assert dictionary.get_strokes("cat") == ["KAT"]
+    assert set(dictionary._strokes) == {"cat"}
+
+    dictionary["HRAOEUS"] = "lies"
+    dictionary["KAT"] = [1]
+    assert dictionary.get_strokes("lies") == ["HRAOEUS"]
+    assert "cat" not in dictionary._strokes